@@ -0,0 +1,109 @@
+#!./venv/Scripts/python.exe
+# -*- coding: UTF-8 -*-
+"""
+测量注册表中每种编码方式在不同数据长度下的编码与解码吞吐量。
+
+每一项都重复运行到至少 --duration 秒，取单次耗时换算为 MiB/s（以原始数据的长度计）。
+只能整体处理的编码方式（base58、base36 等）的复杂度是长度的平方，默认跳过超过 64KiB 的长度。
+
+用法：
+
+>>> python ./benchmarks/codec.py                  # 测量所有编码方式
+>>> python ./benchmarks/codec.py base64 z85 -s 1M # 只测量部分编码方式与长度
+"""
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+import click
+from rich import box
+from rich.console import Console
+from rich.table import Table, Column
+from rich.text import Text
+
+sys.path.insert(0, str(Path(__file__).absolute().parent.parent))
+
+from core.codecs import CODECS  # noqa: E402
+from core.streams import human_size  # noqa: E402
+
+SIZES = ('16', '1K', '64K', '1M')
+UNITS = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+WHOLE_LIMIT = 64 << 10  # 只能整体处理的编码方式默认测量的最大长度
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    return int(text[:-1]) * UNITS[text[-1]] if text[-1:] in UNITS else int(text)
+
+
+def timeit(func: Callable[[bytes], bytes], data: bytes, duration: float) -> float:
+    """
+    重复调用 func(data) 直到累计超过 duration 秒，返回单次的平均耗时（秒）。
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func(data)
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            return elapsed / loops
+        loops *= 2 if elapsed <= 0 else max(2, min(10, int(duration / elapsed) + 1))
+
+
+def rate(size: int, seconds: float) -> Text:
+    mib = size / seconds / (1 << 20)
+    return Text(f'{mib:,.1f}' if mib >= 1 else f'{mib:.3f}', 'bright_cyan' if mib >= 100 else 'cyan' if mib >= 10 else 'yellow')
+
+
+@click.command(__name__, short_help='测量编码方式的吞吐量')
+@click.argument('names', nargs=-1, type=click.Choice(list(CODECS)))
+@click.option('-s', '--size', 'sizes', multiple=True, default=SIZES, show_default=True,
+              help='数据长度，可以使用 K、M 后缀，可以重复指定。')
+@click.option('-d', '--duration', type=float, default=0.2, help='每一项至少运行多少秒，默认是 0.2 。')
+@click.option('-a', '--all-sizes', is_flag=True, help='只能整体处理的编码方式也测量超过 64KiB 的长度。')
+@click.help_option('-h', '--help', help='列出这份帮助信息。')
+def benchmark(names: tuple[str], sizes: tuple[str], duration: float, all_sizes: bool):
+    """
+    测量 NAMES（默认是所有已注册的编码方式）的编码与解码吞吐量，单位是 MiB/s 。
+    """
+    console = Console()
+    monitor = Console(stderr=True)
+    try:
+        lengths = [parse_size(s) for s in sizes]
+    except (ValueError, IndexError):
+        monitor.print('无法识别的数据长度：', ' '.join(sizes), style='yellow')
+        exit(-1)
+
+    payloads = {n: os.urandom(n) for n in lengths}
+    table = Table(
+        '编码方式',
+        *(Column(f'{human_size(n)} 编码', justify='right') for n in lengths),
+        *(Column(f'{human_size(n)} 解码', justify='right') for n in lengths),
+        box=box.SIMPLE_HEAD,
+        caption='单位 MiB/s，以原始数据的长度计',
+    )
+    with monitor.status('正在测量...', spinner='bouncingBar') as status:
+        for name in names or CODECS:
+            codec = CODECS[name]
+            encodes, decodes = [], []
+            for n, data in payloads.items():
+                if not codec.block and n > WHOLE_LIMIT and not all_sizes:
+                    encodes.append(Text('-', 'dim'))
+                    decodes.append(Text('-', 'dim'))
+                    continue
+                status.update(f'正在测量 {name} {human_size(n)}')
+                encoded = codec.encode(data)
+                if codec.decode(encoded) != data:
+                    monitor.print(f'{name} 无法还原 {human_size(n)} 的数据', style='yellow')
+                    exit(1)
+                encodes.append(rate(n, timeit(codec.encode, data, duration)))
+                decodes.append(rate(n, timeit(codec.decode, encoded, duration)))
+            table.add_row(name, *encodes, *decodes)
+    console.print(table)
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,173 @@
+#!./venv/Scripts/python.exe
+# -*- coding: UTF-8 -*-
+"""
+测量每个入口脚本的冷启动与热启动耗时，并与保存的基线进行比较。
+
+- 冷启动：每次都使用全新的字节码缓存目录（PYTHONPYCACHEPREFIX），所有模块都需要重新编译。
+- 热启动：先预热一次字节码缓存，再多次运行取中位数。
+- 导入耗时：使用 -X importtime 运行一次，按顶层包（rich、click、configs 等）汇总每个模块自身的导入耗时。
+
+用法：
+
+>>> python ./benchmarks/startup.py           # 测量并与基线比较，出现退化时退出码为 1
+>>> python ./benchmarks/startup.py --save    # 测量并保存为新的基线
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import click
+from rich import box
+from rich.console import Console
+from rich.table import Table, Column
+from rich.text import Text
+
+root: Path = Path(__file__).absolute().parent.parent  # 项目根目录
+baseline: Path = Path(__file__).absolute().parent / 'startup-baseline.json'
+
+# 入口脚本 -> 参数。尽量选择不需要交互、能代表日常调用的参数
+ENTRIES: dict[str, tuple[str, ...]] = {
+    'shulker.py': ('--help',),
+    'char.py': ('--help',),
+    'url.py': ('--help',),
+    'mkbin.py': ('16',),
+    'mkbit.py': ('128',),
+    'mkstr.py': ('16', '-d'),
+    'wp.py': ('--help',),
+    'fox.py': ('--help',),
+    'yudo.py': ('help',),
+    'edit.py': ('--help',),
+}
+
+# 需要单独汇总导入耗时的顶层包，其余归入 stdlib/其它
+PACKAGES = ('rich', 'click', 'configs', 'core')
+
+
+def run(script: str, args: tuple[str, ...], pycache: str, *options: str) -> tuple[float, str]:
+    """
+    运行一次入口脚本，返回墙上时间（秒）及标准错误的内容。
+    """
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=pycache)
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, *options, str(root / script), *args],
+        cwd=root,
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='UTF-8',
+        errors='replace',
+    )
+    return time.perf_counter() - start, proc.stderr
+
+
+def importtime(stderr: str) -> dict[str, float]:
+    """
+    解析 -X importtime 的输出，按顶层包汇总模块自身的导入耗时（毫秒）。
+    """
+    totals = dict.fromkeys([*PACKAGES, 'other'], 0.0)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # 表头
+        package = fields[2].strip().split('.')[0]
+        totals[package if package in totals else 'other'] += int(fields[0]) / 1000
+    return totals
+
+
+def measure(script: str, args: tuple[str, ...], repeat: int) -> dict:
+    with tempfile.TemporaryDirectory() as warm:
+        colds = []
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as cold:
+                colds.append(run(script, args, cold)[0])
+        run(script, args, warm)  # 预热字节码缓存
+        warms = [run(script, args, warm)[0] for _ in range(repeat)]
+        _, stderr = run(script, args, warm, '-X', 'importtime')
+    return dict(
+        cold=statistics.median(colds) * 1000,
+        warm=statistics.median(warms) * 1000,
+        packages=importtime(stderr),
+    )
+
+
+@click.command(__name__, short_help='测量入口脚本的启动耗时')
+@click.argument('scripts', nargs=-1)
+@click.option('-n', '--repeat', type=int, default=5, help='每项测量运行多少次并取中位数，默认是 5 。')
+@click.option('-s', '--save', is_flag=True, help='将本次结果保存为基线。')
+@click.option('-t', '--tolerance', type=float, default=0.2, help='热启动允许比基线慢多少比例，默认是 0.2 。')
+@click.option('-m', '--slack', type=float, default=5, help='热启动允许比基线慢多少毫秒，默认是 5 。')
+@click.help_option('-h', '--help', help='列出这份帮助信息。')
+def benchmark(scripts: tuple[str], repeat: int, save: bool, tolerance: float, slack: float):
+    """
+    测量 SCRIPTS（默认是所有入口脚本）的冷启动与热启动耗时，并与基线比较。
+
+    只有热启动同时超出比例容差和绝对容差时才视为退化。
+    """
+    console = Console()
+    monitor = Console(stderr=True)
+
+    unknown = [s for s in scripts if s not in ENTRIES]
+    if unknown:
+        monitor.print('未知的入口脚本：', '、'.join(unknown), style='yellow')
+        exit(-1)
+
+    try:
+        with baseline.open('r', encoding='UTF-8') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+
+    results = {}
+    with monitor.status('正在测量...', spinner='bouncingBar') as status:
+        for script in scripts or ENTRIES:
+            status.update(f'正在测量 {script}')
+            results[script] = measure(script, ENTRIES[script], repeat)
+
+    table = Table(
+        '脚本',
+        Column('冷启动', justify='right'),
+        Column('热启动', justify='right'),
+        Column('基线', justify='right'),
+        *(Column(p, justify='right') for p in [*PACKAGES, 'other']),
+        box=box.SIMPLE_HEAD,
+    )
+    regressions = []
+    for script, result in results.items():
+        base = previous.get(script, {}).get('warm')
+        if base is None:
+            verdict = Text('-', 'dim')
+        elif result['warm'] > base * (1 + tolerance) and result['warm'] - base > slack:
+            regressions.append(script)
+            verdict = Text(f'{base:.1f} ms', 'red')
+        else:
+            verdict = Text(f'{base:.1f} ms', 'green')
+        table.add_row(
+            script,
+            f'{result["cold"]:.1f} ms',
+            f'{result["warm"]:.1f} ms',
+            verdict,
+            *(f'{v:.1f}' for v in result['packages'].values()),
+        )
+    console.print(table)
+
+    if save:
+        with baseline.open('w', encoding='UTF-8') as f:
+            json.dump(previous | results, f, ensure_ascii=False, indent=2)
+        monitor.print('已保存基线', str(baseline))
+    elif regressions:
+        monitor.print('启动耗时退化：', '、'.join(regressions), style='yellow')
+        exit(1)
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -1,15 +1,19 @@
 #!./venv/Scripts/python.exe
 # -*- coding: UTF-8 -*-
-import base64 as b64
+import codecs
+import time
+from collections import Counter
+from typing import BinaryIO
 
 import click
-from rich import box
-from rich.panel import Panel
-from rich.table import Column, Table
-from rich.text import Text
 
 from configs import charsets
+from core.codecs import (BASES, CODECS, WHITESPACE, Codec, decode_stream, detect, encode_stream, lookup, measure_input,
+                         parallel, sniff, strip_whitespace)
 from core.console import HydroConsole
+from core.generators import cpu_workers
+from core.streams import BLOCK, Meter, convert_lines, open_sink, open_source, repeat
+from core.text import measure, measure_stream
 
 
 @click.group(__name__, short_help='字符工具')
@@ -27,6 +31,9 @@ def character():
 @character.command('show', short_help='列出所有预设的字符集')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
 def shower():
+    from rich import box
+    from rich.table import Column, Table
+
     table = Table(
         Column('名称'),
         Column('字符集', overflow='ignore'),
@@ -41,24 +48,170 @@ def shower():
     console.print(table)
 
 
+def choose(fmt: str | None,
+           lower_hex: bool,
+           upper_hex: bool,
+           base: int | None,
+           b64_safe: bool,
+           b32_hex: bool) -> Codec | None:
+    """
+    根据选项从注册表中选择编码方式，都没有指定时返回 None 。
+
+    :raise ValueError: 不支持的 Base 。
+    """
+    if fmt:
+        return lookup(fmt)
+    elif lower_hex:
+        return CODECS['hex']
+    elif upper_hex:
+        return CODECS['HEX']
+    elif base:
+        return lookup(base=base)
+    elif b64_safe:
+        return CODECS['base64url']
+    elif b32_hex:
+        return CODECS['base32hex']
+    return None
+
+
+def stream(codec: Codec | None, source: str, output: str | None, decode: bool, jobs: int = 1):
+    """
+    流式地编码或解码文件（或管道），写入文件时输出吞吐量。
+
+    jobs 大于 1 时使用多进程并行处理，此时输入和输出都必须是普通文件。
+    解码时 codec 为 None 表示根据输入的开头自动识别编码方式。
+    """
+    console = HydroConsole(stderr=True)
+    meter = Meter()
+    size = None
+    if jobs > 1:
+        if source == '-' or output in (None, '-'):
+            console.warning('并行处理时必须使用 -i 和 -O 指定输入与输出文件。')
+            exit(-1)
+        try:
+            if codec is None:
+                with open(source, 'rb') as src:
+                    codec = recognize(src)[0]
+            size = measure_input(codec, source, decode)
+        except OSError as e:
+            console.warning(str(e))
+            exit(-1)
+        if size is None and not codec.block:
+            console.warning(f'{codec.name} 只能整体处理，无法并行，改为单进程处理。')
+        elif size is None and codec.normalize is not strip_whitespace:
+            console.warning(f'{codec.name} 解码前需要规范化，无法并行解码，改为单进程流式解码。')
+        elif size is None:
+            console.warning('输入中含有换行等空白字符，无法并行解码，改为单进程流式解码。')
+    try:
+        if size is not None:
+            parallel(codec, source, output, jobs, decode, size)
+            meter.add(size)
+        elif decode:
+            with open_source(source) as src, open_sink(output) as sink:
+                head = b''
+                if codec is None:
+                    codec, head = recognize(src)
+                meter.add(decode_stream(codec, src, sink, head=head))
+        else:
+            with open_source(source) as src, open_sink(output) as sink:
+                meter.add(encode_stream(codec, src, sink))
+    except OSError as e:
+        console.warning(str(e))
+        exit(-1)
+    except ValueError:
+        console.warning('格式错误。')
+        exit(-1)
+    if output not in (None, '-'):
+        console.print('已处理', meter.report())
+
+
+def recognize(source: BinaryIO) -> tuple[Codec, bytes]:
+    """
+    识别流式输入的编码方式，并在标准错误中报告。无法识别时退出。
+    """
+    console = HydroConsole(stderr=True)
+    try:
+        codec, head = sniff(source)
+    except ValueError:
+        console.warning('无法识别输入的编码格式。')
+        exit(-1)
+    console.print(f'识别为 {codec.name}')
+    return codec, head
+
+
+def auto_codec(encoding: str) -> tuple[Codec, Counter]:
+    """
+    逐条自动识别编码方式的伪编码，只能用于解码。只有解码结果可以按 encoding 解码为字符串时才算识别成功。
+
+    :return: 伪编码，以及统计每种编码方式各识别出多少条的计数器。
+    """
+    chosen = Counter()
+
+    def decode(record: bytes) -> bytes:
+        codec, data = detect(record, lambda decoded: decoded.decode(encoding))
+        chosen[codec.name] += 1
+        return data
+
+    return Codec('auto', codec_unsupported, decode, 1, 1), chosen
+
+
+def codec_unsupported(data: bytes) -> bytes:
+    raise ValueError('自动识别只能用于解码')
+
+
 @character.command('encode', short_help='将字符串转换为其它形式')
 @click.option('-x', '--lower-hex', is_flag=True, help='转换为纯小写的HEX。')
 @click.option('-X', '--upper-hex', is_flag=True, help='转换为纯大写的HEX。')
-@click.option('-b', '--base', type=int, help='转换为 base64／base32／base85。')
+@click.option('-f', '--format', 'fmt', type=click.Choice(list(CODECS)), help='使用注册表中的任意一种编码方式。')
+@click.option('-b', '--base', type=int, help=f'转换为 Base{"／".join(map(str, BASES))}。')
 @click.option('--b64-safe', is_flag=True, help='转换为 base64，并使用 -_ 代替 +/ 符号。')
 @click.option('--b32-hex', is_flag=True, help='转换为 base32，并使用 HEX Base32 码表。详见参考信息。')
 @click.option('-e', '--encoding', default='UTF-8', help='字符串编码，默认是 UTF-8。')
+@click.option('-i', '--input', 'source', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='流式读取文件的原始字节而不是请求输入，- 表示标准输入。')
+@click.option('-O', '--output', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='将结果写入文件，- 表示标准输出。')
+@click.option('-l', '--lines', is_flag=True, help='将输入（默认是标准输入）的每一行当作一条字符串，逐行转换。')
+@click.option('-j', '--jobs', metavar='N', type=int, default=1, help='使用多少个进程并行处理 -i 指定的文件，0 表示CPU核心数。默认是 1 。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
-def encoder(lower_hex: bool,
+def encoder(fmt: str | None,
+            lower_hex: bool,
             upper_hex: bool,
             base: int | None,
             b64_safe: bool,
             b32_hex: bool,
-            encoding: str):
+            encoding: str,
+            source: str | None,
+            output: str | None,
+            lines: bool,
+            jobs: int):
     """
     将字符串按照指定编码转换为其它形式。
+
+    使用 -i 时按编码方式的分组大小（base64 为3字节、base32 为5字节、base85 为4字节）分块处理，
+    内存占用恒定，可以处理任意大小的文件。base58、base36 把整个输入当作一个大整数，只能整体处理。
+
+    使用 -l 时每一行都是一条独立的字符串，格式错误的行会报告行号，并输出为空行。
+
+    使用 -j 时将文件内存映射后按分组对齐切分，由多个进程并行编码，各自写入预先分配好的输出位置。
     """
     console = HydroConsole(stderr=True)
+    try:
+        codec = choose(fmt, lower_hex, upper_hex, base, b64_safe, b32_hex)
+    except ValueError as e:
+        console.warning(str(e))
+        exit(-1)
+
+    if source is not None or lines:
+        if codec is None:
+            console.warning('未指定格式。')
+            exit(-1)
+        if lines:
+            convert_lines(codec.encode, source, output, encoding, decode=False)
+        else:
+            stream(codec, source, output, decode=False, jobs=cpu_workers(jobs))
+        return
+
     try:
         string: str = console.ask('输入任意字符串：', style='cyan')
     except KeyboardInterrupt:
@@ -71,70 +224,103 @@ def encoder(lower_hex: bool,
     except:
         console.print_exception()
         exit(-1)
-    if lower_hex:
-        print(binary.hex())
-    elif upper_hex:
-        print(binary.hex().upper())
-    elif base == 64:
-        print(b64.b64encode(binary).decode('ASCII'))
-    elif base == 32:
-        print(b64.b32encode(binary).decode('ASCII'))
-    elif base == 85:
-        print(b64.b85encode(binary).decode('ASCII'))
-    elif base:
-        console.warning(f'不支持转换为 Base{base}')
-    elif b64_safe:
-        print(b64.urlsafe_b64encode(binary).decode('ASCII'))
-    elif b32_hex:
-        print(b64.b32hexencode(binary).decode('ASCII'))
+    if output is None:
+        print(string if codec is None else codec.encode(binary).decode('ASCII'))
     else:
-        print(string)
+        # 编码结果是 ASCII 文本，与 -e 无关；没有指定格式时才按 -e 写出字符串本身
+        with open_sink(output) as sink:
+            sink.write((string + '\n').encode(encoding) if codec is None else codec.encode(binary) + b'\n')
 
 
 @character.command('decode', short_help='从某种形式还原字符串')
 @click.option('-x', '--lower-hex', is_flag=True, help='转换为纯小写的HEX。')
 @click.option('-X', '--upper-hex', is_flag=True, help='转换为纯大写的HEX。')
-@click.option('-b', '--base', type=int, help='转换为 base64／base32／base85。')
+@click.option('-f', '--format', 'fmt', type=click.Choice(list(CODECS)), help='使用注册表中的任意一种编码方式。')
+@click.option('-b', '--base', type=int, help=f'转换为 Base{"／".join(map(str, BASES))}。')
 @click.option('--b64-safe', is_flag=True, help='转换为 base64，并使用 -_ 代替 +/ 符号。')
 @click.option('--b32-hex', is_flag=True, help='转换为 base32，并使用 HEX Base32 码表。详见参考信息。')
 @click.option('-e', '--encoding', default='UTF-8', help='字符串编码，默认是 UTF-8。')
+@click.option('-i', '--input', 'source', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='流式读取文件而不是请求输入，- 表示标准输入。忽略其中所有空白字符。')
+@click.option('-O', '--output', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='将还原出的原始字节写入文件，- 表示标准输出。')
+@click.option('-l', '--lines', is_flag=True, help='将输入（默认是标准输入）的每一行当作一条编码结果，逐行还原。')
+@click.option('-j', '--jobs', metavar='N', type=int, default=1, help='使用多少个进程并行处理 -i 指定的文件，0 表示CPU核心数。默认是 1 。')
+@click.option('-a', '--auto', is_flag=True, help='自动识别编码格式，并在标准错误中报告识别结果。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
-def decoder(lower_hex: bool,
+def decoder(fmt: str | None,
+            lower_hex: bool,
             upper_hex: bool,
             base: int | None,
             b64_safe: bool,
             b32_hex: bool,
-            encoding: str):
+            encoding: str,
+            source: str | None,
+            output: str | None,
+            lines: bool,
+            jobs: int,
+            auto: bool):
     """
     按照指定编码从某种形式还原字符串。
+
+    使用 -i 时按编码方式的分组大小分块处理，内存占用恒定，可以处理任意大小的文件。
+
+    使用 -l 时每一行都是一条独立的编码结果，格式错误的行会报告行号，并输出为空行。
+
+    使用 -j 时将文件内存映射后按分组对齐切分，由多个进程并行解码，各自写入预先分配好的输出位置。
+    此时输入中除末尾以外不能有空白字符。
+
+    使用 -a 时按 HEX、base32、base32hex、base64、base64url、base85 的顺序，
+    先检查字符集、长度和填充，再依次尝试解码，采用第一个成功的编码方式。
+    使用 -l 时每一行单独识别，最后报告各种编码方式的行数；使用 -i 时根据开头的 1MiB 识别。
     """
     console = HydroConsole(stderr=True)
+    try:
+        codec = choose(fmt, lower_hex, upper_hex, base, b64_safe, b32_hex)
+    except ValueError as e:
+        console.warning(str(e))
+        exit(-1)
+    if codec is not None and auto:
+        console.warning('-a 不能与指定格式的选项同时使用。')
+        exit(-1)
+    if codec is None and not auto:
+        console.warning('未指定格式。')
+        exit(-1)
+
+    if lines:
+        if auto:
+            codec, chosen = auto_codec(encoding)
+        convert_lines(lambda record: codec.decode(record.strip()), source, output, encoding, decode=True)
+        if auto:
+            console.print('识别为', '，'.join(f'{k} {v} 行' for k, v in chosen.most_common()) or '无')
+        return
+    if source is not None:
+        stream(codec, source, output, decode=True, jobs=cpu_workers(jobs))
+        return
+
     try:
         raw = console.ask('输入：', style='cyan')
     except KeyboardInterrupt:
         exit(0)
     try:
-        if lower_hex or upper_hex:
-            data = bytes.fromhex(raw)
-        elif base == 64:
-            data = b64.b64decode(raw)
-        elif base == 85:
-            data = b64.b85decode(raw)
-        elif base == 32:
-            data = b64.b32decode(raw)
-        elif base:
-            console.warning(f'不支持从 Base{base} 还原字符串')
-            exit(-1)
-        elif b64_safe:
-            data = b64.urlsafe_b64decode(raw)
-        elif b32_hex:
-            data = b64.b32hexdecode(raw)
+        binary = raw.encode('ASCII').translate(None, WHITESPACE)
+        if auto:
+            # 输出字符串时，解码结果还必须能按 encoding 解码
+            codec, data = detect(binary, None if output is not None else lambda decoded: decoded.decode(encoding))
         else:
-            console.warning('未指定格式。')
-            exit(-1)
+            data = codec.decode(binary)
+    except LookupError:
+        console.warning('无法识别的编码', encoding)
+        exit(-1)
     except:
         console.warning('格式错误。')
         exit(-1)
+    if auto:
+        console.print(f'识别为 {codec.name}')
+    if output is not None:
+        with open_sink(output) as sink:
+            sink.write(data)
+        return
     try:
         string = data.decode(encoding)
     except LookupError:
@@ -148,21 +334,72 @@ def decoder(lower_hex: bool,
 @character.command('map', short_help='绘制HEX字节分布表', no_args_is_help=False)
 @click.option('-e', '--encoding', default='UTF-8', help='解析字符串时使用的编码，默认是 UTF-8。')
 @click.option('-x', '--hex', 'hexs', is_flag=True, help='输入并解析HEX，而不是字符串。')
+@click.option('-i', '--input', 'source', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='统计文件的所有字节而不是请求输入，- 表示标准输入。')
+@click.option('-c', '--count', is_flag=True, help='在表格中显示每个字节出现的次数。')
+@click.option('-H', '--heat', is_flag=True, help='按出现次数以热力图着色。')
+@click.option('-l', '--live', is_flag=True, help='读取 -i 指定的输入时实时刷新表格。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
-def mapper(encoding: str, hexs: bool):
+def mapper(encoding: str, hexs: bool, source: str | None, count: bool, heat: bool, live: bool):
     """
-    映射字符串或HEX，并绘制HEX字节分布表。
+    映射字符串、HEX或文件，并绘制HEX字节分布表。
 
     输出结果的
     b 指的是比特数目 bits，
     B 指的是字节数目 bytes，
-    C 指的是字符个数 characters。
+    C 指的是字符个数 characters，
+    H 指的是香农熵（比特每字节）。
     """
+    if live and source is None:
+        raise click.UsageError('-l 只能与 -i 同时使用。')
+
+    from rich.panel import Panel
+    from rich.text import Text
+
+    from core.histogram import ByteHistogram, byte_grid
+
     console = HydroConsole()
+    histogram = ByteHistogram()
+    grid = byte_grid(3 if count else 2)
+    string = None
+
+    def draw() -> Panel:
+        status = Text().join([
+            Text(str(histogram.total * 8), 'bright_cyan'), Text('b, '),
+            Text(str(histogram.total), 'bright_cyan'), Text('B, '),
+            *([Text(str(len(string)), 'bright_cyan'), Text('C, ')] if string is not None else []),
+            Text(f'{histogram.entropy():.3f}', 'bright_cyan'), Text('H, '),
+            Text(f'<{source or encoding or "HEX"}>'),
+        ])
+        body = grid.render(histogram, count, heat)
+        return Panel(body, expand=False, subtitle=status, border_style="dim")
+
+    if source is not None:
+        try:
+            with open_source(source) as src:
+                if not live:
+                    histogram.consume(src)
+                    console.print(draw())
+                    return
+                from rich.live import Live
+
+                with Live(draw(), console=console.console, auto_refresh=False) as screen:
+                    refreshed = time.monotonic()
+                    while chunk := src.read(BLOCK):
+                        histogram.update(chunk)
+                        if time.monotonic() - refreshed >= 0.1:
+                            screen.update(draw(), refresh=True)
+                            refreshed = time.monotonic()
+                    screen.update(draw(), refresh=True)
+        except OSError as e:
+            console.warning(str(e))
+            exit(-1)
+        return
+
     if hexs:
         try:
             string = console.ask('输入HEX：', style='cyan')
-            binary = bytes.fromhex(string)
+            histogram.update(bytes.fromhex(string))
         except KeyboardInterrupt:
             exit(0)
         except ValueError:
@@ -171,7 +408,7 @@ def mapper(encoding: str, hexs: bool):
     else:
         try:
             string = console.ask('输入字符串：', style='cyan')
-            binary = string.encode(encoding)
+            histogram.update(string.encode(encoding))
         except KeyboardInterrupt:
             exit(0)
         except LookupError:
@@ -181,51 +418,94 @@ def mapper(encoding: str, hexs: bool):
             console.warning(f'{encoding} 解码失败。')
             exit(-1)
 
-    bs = set(binary)
-    status = Text().join([
-        Text(str(len(binary) * 8), 'bright_cyan'), Text('b, '),
-        Text(str(len(binary)), 'bright_cyan'), Text('B, '),
-        Text(str(len(string)), 'bright_cyan'), Text('C, '),
-        Text(f'<{encoding or "HEX"}>'),
-    ])
-    body = Text('\n').join(
-        Text(',', 'bright_black').join(
-            Text(
-                f'{(b := j * 16 + i):02x}',
-                'white' if b in bs else 'bright_black'
-            )
-            for i in range(16)
-        )
-        for j in range(16)
-    )
-    panel = Panel(body, expand=False, subtitle=status, border_style="dim")
-    console.print(panel)
+    console.print(draw())
 
 
 @character.command('repeat', short_help='重复生成输入的字符串')
 @click.argument('times', type=int)
+@click.option('-s', '--string', help='需要重复的字符串，不指定时请求输入。')
+@click.option('-e', '--encoding', default='UTF-8', help='输出的字符串编码，默认是 UTF-8。')
+@click.option('-O', '--output', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='将结果写入文件，- 表示标准输出。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
-def repeater(times):
-    console = HydroConsole()
+def repeater(times: int, string: str | None, encoding: str, output: str | None):
+    """
+    将字符串重复若干次后输出，最后输出一个换行符。
+
+    结果按约 1MiB 的整块流式写出，重复次数再多也不会占用更多内存。写入文件时报告吞吐量。
+    使用增量编码器，UTF-16、UTF-32 等编码的 BOM 只在开头出现一次。
+    """
+    console = HydroConsole(stderr=True)
+    if string is None:
+        try:
+            string = console.ask('输入需要重复的字符串：', style='cyan')
+        except KeyboardInterrupt:
+            exit(0)
     try:
-        string = console.ask('输入需要重复的字符串：', style='cyan')
-    except KeyboardInterrupt:
-        exit(0)
+        encoder = codecs.getincrementalencoder(encoding)()
+        head = encoder.encode(string) if times > 0 else b''
+        data = encoder.encode(string)
+        tail = encoder.encode('\n', final=True)
+    except LookupError:
+        console.warning('无法识别的编码', encoding)
+        exit(-1)
+    except UnicodeEncodeError:
+        console.warning(f'{encoding} 编码失败。')
+        exit(-1)
 
-    string *= times
-    print(string)
+    meter = Meter()
+    try:
+        with open_sink(output) as sink:
+            meter.add(sink.write(head))
+            meter.add(repeat(data, times - 1, sink))
+            meter.add(sink.write(tail))
+    except OSError as e:
+        console.warning(str(e))
+        exit(-1)
+    if output not in (None, '-'):
+        console.print('已写入', meter.report())
 
 
 @character.command('len', short_help='测量字符个数')
+@click.option('-e', '--encoding', default='UTF-8', help='字符串编码，默认是 UTF-8。')
+@click.option('-i', '--input', 'source', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='流式测量文件而不是请求输入，- 表示标准输入。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
-def measurer():
+def measurer(encoding: str, source: str | None):
+    """
+    测量字符串的字节数、字符（码位）个数与字素簇（用户感知的字符，例如一个带肤色的 emoji）个数。
+
+    使用 -i 时按块增量解码和统计，内存占用恒定，并报告吞吐量。
+    安装了 regex 时按 Unicode 标准切分字素簇，否则使用近似规则。
+    """
     console = HydroConsole()
+    meter = Meter()
     try:
-        string = console.ask('输入任意字符串：', style='cyan')
-    except KeyboardInterrupt:
-        exit(0)
+        if source is None:
+            try:
+                string = console.ask('输入任意字符串：', style='cyan')
+            except KeyboardInterrupt:
+                exit(0)
+            length = measure(string, encoding)
+        else:
+            with open_source(source) as src:
+                length = measure_stream(src, encoding)
+            meter.add(length.bytes)
+    except LookupError:
+        console.warning('无法识别的编码', encoding)
+        exit(-1)
+    except UnicodeError:
+        console.warning(f'{encoding} 编解码失败。')
+        exit(-1)
+    except OSError as e:
+        console.warning(str(e))
+        exit(-1)
 
-    console.print('字符个数：', len(string))
+    console.print('字节个数：', length.bytes)
+    console.print('字符个数：', length.chars)
+    console.print('字素簇个数：', length.graphemes)
+    if source is not None:
+        console.print('已处理', meter.report())
 
 
 character.add_command(encoder, 'enc')
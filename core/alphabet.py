@@ -0,0 +1,71 @@
+from functools import lru_cache
+from math import ceil
+from random import Random
+
+
+class Alphabet:
+    """
+    预先计算好转换表的字符集，用于批量生成随机字符串。
+
+    一次性生成整个数据块所需的随机字节，用 bytes.translate 删除会导致偏差的字节（拒绝采样），
+    再把剩下的每个字节映射为字符集中的字符，整个过程都在C代码中完成。
+    字符集超过256个字符时退化为逐行调用 Random.choices 。
+    """
+
+    def __init__(self, chars: str):
+        self.chars = chars
+        self.size = len(chars)
+        self.vectorized = 0 < self.size <= 256
+        if not self.vectorized:
+            return
+        # 0 ~ limit-1 的字节对 size 取模是均匀的，其余字节全部拒绝
+        self.limit = 256 - 256 % self.size
+        self.rejected = bytes(range(self.limit, 256))
+        self.latin1 = all(ord(c) < 256 for c in chars)
+        if self.latin1:
+            self.table = bytes(ord(chars[b % self.size]) for b in range(256))
+        else:
+            self.table = bytes(b % self.size for b in range(256))
+            self.mapping = str.maketrans(dict(zip(map(chr, range(self.size)), chars)))
+
+    def symbols(self, rng: Random, n: int) -> bytes:
+        """
+        生成 n 个均匀分布的符号。字符集是 Latin-1 时直接是字符本身，否则是字符的下标。
+        """
+        parts = []
+        remain = n
+        while remain > 0:
+            # 按接受率多取一些，绝大多数情况下一轮就够了
+            raw = rng.randbytes(ceil(remain * 256 / self.limit * 1.02) + 16)
+            part = raw.translate(self.table, self.rejected)
+            parts.append(part)
+            remain -= len(part)
+        return b''.join(parts)[:n]
+
+    def lines(self, rng: Random, count: int, length: int) -> bytes:
+        """
+        生成 count 行、每行 length 个字符的随机字符串，以换行符连接并以 UTF-8 编码。
+        """
+        if not self.vectorized:
+            rows = (''.join(rng.choices(self.chars, k=length)) for _ in range(count))
+            return ('\n'.join(rows) + '\n').encode('UTF-8')
+        if length == 0:
+            return b'\n' * count
+
+        total = count * length
+        block = self.symbols(rng, total)
+        rows = (block[i:i + length] for i in range(0, total, length))
+        if not self.latin1:
+            # 下标可能恰好是换行符的码位，所以先逐行映射为字符再连接
+            text = '\n'.join(row.decode('latin-1').translate(self.mapping) for row in rows)
+            return (text + '\n').encode('UTF-8')
+        block = b'\n'.join(rows) + b'\n'
+        return block if self.chars.isascii() else block.decode('latin-1').encode('UTF-8')
+
+
+@lru_cache(maxsize=8)
+def alphabet(chars: str) -> Alphabet:
+    """
+    获取字符集对应的 Alphabet ，同一个进程中只会计算一次转换表。
+    """
+    return Alphabet(chars)
@@ -0,0 +1,500 @@
+import base64 as b64
+import binascii
+import itertools
+import mmap
+import multiprocessing
+import os
+import string
+from functools import lru_cache, partial
+from typing import BinaryIO, Callable, NamedTuple
+
+from core.streams import BLOCK
+
+WHITESPACE = b' \t\r\n\v\f'
+
+
+def hex_upper(data: bytes) -> bytes:
+    return binascii.hexlify(data).upper()
+
+
+def strip_whitespace(data: bytes) -> bytes:
+    return data.translate(None, WHITESPACE)
+
+
+def b64decode(data: bytes) -> bytes:
+    """
+    严格的 base64 解码。b64decode() 默认会悄悄丢弃码表以外的字节，使分块解码时各块错位而不报错。
+    """
+    return b64.b64decode(strip_whitespace(data), validate=True)
+
+
+def b64decode_urlsafe(data: bytes) -> bytes:
+    return b64.b64decode(strip_whitespace(data), altchars=b'-_', validate=True)
+
+
+class Codec(NamedTuple):
+    """
+    二进制到文本的编码方式。
+
+    编码时每 block 个字节对应 width 个字符，
+    所以只要按 block 的整数倍切分原始数据（或按 width 的整数倍切分编码结果），
+    各段分别编码（解码）后直接拼接，就与整体编码（解码）的结果完全相同。
+    block 为 0 表示只能整体编码（解码），例如把整个输入当作一个大整数的 base58 。
+
+    normalize 在解码前删除空白等可以忽略的字符并统一写法，它必须逐字节独立地处理，
+    这样流式解码时先规范化每一块、再按 width 对齐切分，结果才与整体解码相同。
+    decode 自身也应当接受未经规范化的输入。
+    """
+    name: str
+    encode: Callable[[bytes], bytes]
+    decode: Callable[[bytes], bytes]
+    block: int
+    width: int
+    normalize: Callable[[bytes], bytes] = strip_whitespace
+
+
+CODECS: dict[str, Codec] = {}
+BASES: dict[int, str] = {}  # -b N 选择的编码方式
+
+
+def register(codec: Codec, base: int | None = None) -> Codec:
+    """
+    注册一种编码方式。注册后 char、mkbin、mkbit 等命令的 -f 选项都可以直接使用它。
+
+    :param base: 作为 -b BASE 的默认编码方式。同一个 BASE 以先注册的为准。
+    """
+    CODECS[codec.name] = codec
+    if base is not None:
+        BASES.setdefault(base, codec.name)
+    return codec
+
+
+def lookup(name: str | None = None, base: int | None = None) -> Codec:
+    """
+    按名称或 BASE 查找编码方式，名称优先。
+
+    :raise ValueError: 不支持的编码方式。
+    """
+    if name is not None:
+        if name not in CODECS:
+            raise ValueError(f'不支持 {name}')
+        return CODECS[name]
+    if base not in BASES:
+        raise ValueError(f'不支持 Base{base}')
+    return CODECS[BASES[base]]
+
+
+def translation(source: bytes, target: bytes, invalid: bytes = b'"') -> bytes:
+    """
+    将 source 中的第 i 个字符映射为 target 中的第 i 个字符，其余字节全部映射为 invalid 。
+    """
+    table = bytearray(invalid * 256)
+    for s, t in zip(source, target):
+        table[s] = t
+    return bytes(table)
+
+
+B85 = (string.digits + string.ascii_uppercase + string.ascii_lowercase + '!#$%&()*+-;<=>?@^_`{|}~').encode('ASCII')
+
+
+class Rebased85:
+    """
+    与 base85 算法相同、只是字符表不同的编码方式，例如 ascii85 和 Z85 。
+
+    编码时不使用 ascii85 的 z 缩写，所以每4个字节总是对应5个字符；解码时仍然接受 z 缩写。
+    """
+
+    def __init__(self, alphabet: bytes, zero: bytes = b''):
+        self.zero = zero
+        self.zeros = alphabet[:1] * 5
+        self.to_b85 = translation(alphabet, B85)
+        self.from_b85 = translation(B85, alphabet)
+
+    def encode(self, data: bytes) -> bytes:
+        return b64.b85encode(data).translate(self.from_b85)
+
+    def normalize(self, data: bytes) -> bytes:
+        data = data.translate(None, WHITESPACE)
+        # z 是4个 \0 字节的缩写，展开后才能按5个字符对齐
+        return data.replace(self.zero, self.zeros) if self.zero else data
+
+    def decode(self, data: bytes) -> bytes:
+        return b64.b85decode(self.normalize(data).translate(self.to_b85))
+
+
+class Crockford:
+    """
+    Crockford Base32 ：不易混淆的字符表，没有填充。解码时忽略大小写和连字符，并把 I、L 视为 1 ，O 视为 0 。
+    """
+    ALPHABET = b'0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+    STANDARD = b'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567'
+
+    def __init__(self):
+        canonical = bytearray(range(256))
+        for c in string.ascii_lowercase.encode('ASCII'):
+            canonical[c] = c - 32
+        for c in b'IiLl':
+            canonical[c] = ord('1')
+        for c in b'Oo':
+            canonical[c] = ord('0')
+        self.canonical = bytes(canonical)
+        self.to_standard = translation(self.ALPHABET, self.STANDARD, b'!')
+        self.from_standard = translation(self.STANDARD, self.ALPHABET)
+
+    def encode(self, data: bytes) -> bytes:
+        return b64.b32encode(data).rstrip(b'=').translate(self.from_standard)
+
+    def normalize(self, data: bytes) -> bytes:
+        return data.translate(self.canonical, WHITESPACE + b'-')
+
+    def decode(self, data: bytes) -> bytes:
+        data = self.normalize(data).translate(self.to_standard)
+        return b64.b32decode(data + b'=' * (-len(data) % 8))
+
+
+class BigBase:
+    """
+    把整个输入当作一个大端序的大整数，转换为 base 进制，例如 base58 和 base36 。
+    开头的每个 \0 字节都对应一个零字符，以便还原原始长度。
+
+    大整数每次除以 base 的 k 次幂（不超过 2**64 的最大的幂），一次得到 k 位，
+    所以 Python 层面的循环次数约为输出位数的 1/k ，但总的复杂度仍然是输入长度的平方，只适合较短的数据。
+    """
+
+    def __init__(self, alphabet: bytes, casefold: bool = False):
+        self.alphabet = alphabet
+        self.base = len(alphabet)
+        self.k = 1
+        while self.base ** (self.k + 1) < 1 << 64:
+            self.k += 1
+        self.limb = self.base ** self.k
+        values = [-1] * 256
+        for i, c in enumerate(alphabet):
+            values[c] = i
+            if casefold:
+                values[bytes([c]).upper()[0]] = values[bytes([c]).lower()[0]] = i
+        self.values = values
+        self.invalid = bytes(b for b in range(256) if values[b] < 0)
+
+    def encode(self, data: bytes) -> bytes:
+        body = data.lstrip(b'\0')
+        n = int.from_bytes(body, 'big')
+        base, alphabet, k = self.base, self.alphabet, self.k
+        out = bytearray()
+        while n:
+            n, r = divmod(n, self.limb)
+            for _ in range(k):
+                r, d = divmod(r, base)
+                out.append(alphabet[d])
+        out = out.rstrip(alphabet[:1])
+        out.reverse()
+        return alphabet[:1] * (len(data) - len(body)) + bytes(out)
+
+    def decode(self, data: bytes) -> bytes:
+        data = data.translate(None, WHITESPACE)
+        if data.translate(None, self.invalid) != data:
+            raise ValueError(f'非法的 base{self.base} 字符')
+        values, base, k = self.values, self.base, self.k
+        zeros = len(data) - len(data.lstrip(self.alphabet[:1]))
+        n = 0
+        start = zeros
+        step = (len(data) - zeros) % k or k  # 先取不足 k 位的开头，之后每次 k 位
+        while start < len(data):
+            r = 0
+            for c in data[start:start + step]:
+                r = r * base + values[c]
+            n = n * (self.limb if step == k else base ** step) + r
+            start += step
+            step = k
+        body = n.to_bytes((n.bit_length() + 7) // 8, 'big')
+        return b'\0' * zeros + body
+
+
+register(Codec('hex', binascii.hexlify, binascii.unhexlify, 1, 2), 16)
+register(Codec('HEX', hex_upper, binascii.unhexlify, 1, 2))
+register(Codec('base64', b64.b64encode, b64decode, 3, 4), 64)
+register(Codec('base64url', b64.urlsafe_b64encode, b64decode_urlsafe, 3, 4))
+register(Codec('base32', b64.b32encode, b64.b32decode, 5, 8), 32)
+register(Codec('base32hex', b64.b32hexencode, b64.b32hexdecode, 5, 8))
+register(Codec('base85', b64.b85encode, b64.b85decode, 4, 5), 85)
+
+_ascii85 = Rebased85(bytes(range(33, 118)), zero=b'z')
+_z85 = Rebased85(b'0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ.-:+=^!/*?&<>()[]{}@%$#')
+_crockford = Crockford()
+_base58 = BigBase(b'123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz')
+_base36 = BigBase(b'0123456789abcdefghijklmnopqrstuvwxyz', casefold=True)
+register(Codec('ascii85', _ascii85.encode, _ascii85.decode, 4, 5, _ascii85.normalize))
+register(Codec('z85', _z85.encode, _z85.decode, 4, 5))
+register(Codec('crockford', _crockford.encode, _crockford.decode, 5, 8, _crockford.normalize))
+register(Codec('base58', _base58.encode, _base58.decode, 0, 0), 58)
+register(Codec('base36', _base36.encode, _base36.decode, 0, 0), 36)
+
+
+def aligned(size: int, unit: int) -> int:
+    """
+    不超过 size 的 unit 的最大整数倍，至少是 unit 。
+    """
+    return max(unit, size - size % unit)
+
+
+def encode_stream(codec: Codec, source: BinaryIO, sink: BinaryIO, size: int = BLOCK) -> int:
+    """
+    以恒定的内存流式编码，每次读取 block 整数倍的字节。最后输出一个换行符。
+
+    :return: 读取的字节数。
+    """
+    if not codec.block:
+        data = source.read()
+        sink.write(codec.encode(data) + b'\n')
+        return len(data)
+    size = aligned(size, codec.block)
+    total = 0
+    carry = b''
+    while chunk := source.read(size):
+        total += len(chunk)
+        data = carry + chunk if carry else chunk
+        cut = len(data) - len(data) % codec.block
+        carry = data[cut:]
+        if cut:
+            sink.write(codec.encode(data[:cut]))
+    sink.write(codec.encode(carry) + b'\n')
+    return total
+
+
+def decode_stream(codec: Codec, source: BinaryIO, sink: BinaryIO, size: int = BLOCK, head: bytes = b'') -> int:
+    """
+    以恒定的内存流式解码，先用 normalize 规范化每一块（忽略空白字符等），每次解码 width 整数倍的字符。
+
+    :param head: 已经从 source 中读出的开头部分，参见 sniff() 。
+    :return: 读取的字节数。
+    :raise ValueError: 格式错误。
+    """
+    if not codec.width:
+        data = head + source.read()
+        sink.write(codec.decode(data))
+        return len(data)
+    size = aligned(size, codec.width)
+    total = 0
+    carry = b''
+    chunks = iter(partial(source.read, size), b'')
+    for chunk in itertools.chain((head,), chunks) if head else chunks:
+        total += len(chunk)
+        data = carry + codec.normalize(chunk)
+        cut = len(data) - len(data) % codec.width
+        carry = data[cut:]
+        if cut:
+            sink.write(codec.decode(data[:cut]))
+    if carry:
+        sink.write(codec.decode(carry))
+    return total
+
+
+class Signature(NamedTuple):
+    """
+    识别编码方式所用的特征。
+
+    chars 是字符集（含填充字符）；
+    remainders 是去掉空白后的长度对 width 取余的合法值；
+    padding 是末尾填充字符 = 的合法个数，只有 (0,) 时表示没有填充。
+    """
+    name: str
+    chars: bytes
+    width: int
+    remainders: frozenset[int]
+    padding: tuple[int, ...] = (0,)
+
+
+def _signature(name: str, chars: str, remainders: set[int], padding: tuple[int, ...] = (0,)) -> Signature:
+    chars += '=' if len(padding) > 1 else ''
+    return Signature(name, chars.encode('ASCII'), CODECS[name].width, frozenset(remainders), padding)
+
+
+# 按优先级排列：字符集越小越靠前，因为小字符集的数据同时也符合大字符集
+SIGNATURES = (
+    _signature('hex', string.hexdigits, {0}),
+    _signature('base32', string.ascii_uppercase + '234567', {0}, (0, 1, 3, 4, 6)),
+    _signature('base32hex', string.digits + 'ABCDEFGHIJKLMNOPQRSTUV', {0}, (0, 1, 3, 4, 6)),
+    _signature('base64', string.ascii_letters + string.digits + '+/', {0}, (0, 1, 2)),
+    _signature('base64url', string.ascii_letters + string.digits + '-_', {0}, (0, 1, 2)),
+    _signature('base85', B85.decode('ASCII'), {0, 2, 3, 4}),
+)
+
+# 每个字节对应一个位掩码，第 i 位表示它属于 SIGNATURES[i] 的字符集
+ACCEPTS = bytes(sum(1 << i for i, sig in enumerate(SIGNATURES) if b in sig.chars) for b in range(256))
+ALL = (1 << len(SIGNATURES)) - 1
+
+
+def candidates(data: bytes, complete: bool = True) -> tuple[Codec, ...]:
+    """
+    按优先级列出 data 可能使用的编码方式。data 中不能有空白字符。
+
+    先用 bytes.translate 把每个字节一次性替换为它的位掩码，
+    不同的位掩码通常只有几种，把它们全部按位与，就得到所有字节都符合的编码方式。
+
+    :param complete: data 是否是完整的编码结果。只是开头的一部分时，不检查长度和填充。
+    """
+    mask = ALL
+    for accepts in set(data.translate(ACCEPTS)):
+        mask &= accepts
+    if not complete:
+        return _select(mask, None, 0, False)
+    padding = inner = 0
+    if 61 in data:  # b'='
+        body = data.rstrip(b'=')
+        padding, inner = len(data) - len(body), b'=' in body
+    return _select(mask, len(data) % 40, padding, inner)
+
+
+@lru_cache(maxsize=1024)
+def _select(mask: int, remainder: int | None, padding: int, inner: bool) -> tuple[Codec, ...]:
+    """
+    candidates() 中与数据内容无关的部分，结果只取决于这几个参数，所以可以缓存。
+
+    :param remainder: 长度对各 width 的最小公倍数 40 取余，为 None 时不检查长度和填充。
+    """
+    found = []
+    for i, sig in enumerate(SIGNATURES):
+        if not mask >> i & 1:
+            continue
+        if remainder is not None:
+            if remainder % sig.width not in sig.remainders:
+                continue
+            if len(sig.padding) > 1 and (padding not in sig.padding or inner):
+                continue
+        found.append(CODECS[sig.name])
+    return tuple(found)
+
+
+def detect(data: bytes, validate: Callable[[bytes], object] | None = None) -> tuple[Codec, bytes]:
+    """
+    识别并解码一条完整的编码结果，按优先级依次尝试每一种可能的编码方式。
+
+    :param validate: 校验解码结果，不合格时抛出 ValueError ，例如解码出的字节不是合法的 UTF-8 。
+                     不合格的编码方式会被跳过，继续尝试下一种。
+    :return: 编码方式及解码结果。
+    :raise ValueError: 无法识别。
+    """
+    for codec in candidates(data):
+        try:
+            decoded = codec.decode(data)
+            if validate is not None:
+                validate(decoded)
+        except ValueError:
+            continue
+        return codec, decoded
+    raise ValueError('无法识别的编码格式')
+
+
+def sniff(source: BinaryIO, size: int = BLOCK) -> tuple[Codec, bytes]:
+    """
+    读取输入开头的一段数据并识别编码方式。
+
+    :return: 编码方式，以及已经读出的数据，应当作为 decode_stream() 的 head 参数。
+    :raise ValueError: 无法识别。
+    """
+    head = source.read(size)
+    sample = head.translate(None, WHITESPACE)
+    if len(head) < size:
+        return detect(sample)[0], head
+    for codec in candidates(sample, complete=False):
+        try:
+            codec.decode(sample[:len(sample) - len(sample) % codec.width])
+        except ValueError:
+            continue
+        return codec, head
+    raise ValueError('无法识别的编码格式')
+
+
+def _process_part(name: str, decode: bool, source: str, start: int, stop: int, output: str, offset: int) -> int:
+    """
+    在子进程中编码（解码）输入文件的 [start, stop) 部分，并写入输出文件的 offset 处。
+
+    :return: 写入的字节数。
+    """
+    codec = CODECS[name]
+    with open(source, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        data = (codec.decode if decode else codec.encode)(m[start:stop])
+    with open(output, 'r+b') as f:
+        f.seek(offset)
+        f.write(data)
+    return len(data)
+
+
+def measure_input(codec: Codec, source: str, decode: bool) -> int | None:
+    """
+    获取需要处理的输入长度。解码时忽略末尾的空白字符，但若中间还有空白字符则返回 None ，
+    因为此时无法按固定的比例计算每一段的输出位置。
+    只能整体处理，或者解码前需要空白字符以外的规范化的编码方式也返回 None 。
+    """
+    if not codec.block or decode and codec.normalize is not strip_whitespace:
+        return None
+    size = os.path.getsize(source)
+    if not decode or size == 0:
+        return size
+    with open(source, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        end = size
+        while end > 0 and m[end - 1] in WHITESPACE:
+            end -= 1
+        if any(m.find(bytes([c]), 0, end) >= 0 for c in WHITESPACE):
+            return None
+    return end
+
+
+def parallel(codec: Codec, source: str, output: str, jobs: int, decode: bool, size: int) -> int:
+    """
+    使用进程池并行地编码（解码）一个大文件。
+
+    输入文件被内存映射后按分组大小对齐切分为多段，每一段的输出位置都可以事先算出，
+    所以输出文件预先分配好空间，各个子进程直接把结果写到各自的位置上，不需要在父进程中重新排序。
+    结果先写入临时文件，全部成功后才替换 output 。
+
+    :param codec: 编码方式。
+    :param source: 输入文件路径。
+    :param output: 输出文件路径。
+    :param jobs: 进程数。
+    :param decode: 是否是解码。
+    :param size: 需要处理的输入长度，参见 measure_input() 。
+    :return: 输出文件的大小。
+    :raise ValueError: 格式错误。
+    """
+    unit, ratio = (codec.width, codec.block) if decode else (codec.block, codec.width)
+    part = aligned(min(max(BLOCK * 8, size // (jobs * 4)), BLOCK * 64), unit)
+    bounds = [(start, min(start + part, size)) for start in range(0, size, part)]
+
+    # 只有最后一段可能不是完整的分组，其余每一段的输出长度都是输入长度的固定倍数
+    full = size - size % unit
+    if decode:
+        total = -(-size // unit) * ratio  # 上限，解码完成后再截断
+    else:
+        with open(source, 'rb') as f:
+            f.seek(full)
+            total = full // unit * ratio + len(codec.encode(f.read(size - full))) + 1
+
+    # 先写入同一目录下的临时文件，全部成功后再改名，失败时不会留下写了一半的输出文件
+    temp = f'{output}.{os.getpid()}.part'
+    try:
+        with open(temp, 'wb') as f:
+            f.truncate(total)
+
+        args = [(codec.name, decode, source, start, stop, temp, start // unit * ratio) for start, stop in bounds]
+        if args:
+            with multiprocessing.Pool(min(jobs, len(args))) as pool:
+                written = pool.starmap(_process_part, args)
+
+        if decode:
+            # base64 等编码方式的最后一个分组可能带有填充，实际长度要以解码结果为准
+            total = args[-1][-1] + written[-1] if args else 0
+            with open(temp, 'r+b') as f:
+                f.truncate(total)
+        else:
+            with open(temp, 'r+b') as f:
+                f.seek(total - 1)
+                f.write(b'\n')
+        os.replace(temp, output)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+    return total
@@ -1,12 +1,83 @@
-from typing import Optional, TextIO, TypeVar, Callable, Any
+from __future__ import annotations
 
-from rich.console import Console
-from rich.text import TextType
+import os
+import sys
+from typing import TYPE_CHECKING, Optional, TextIO, TypeVar, Callable, Any
+
+if TYPE_CHECKING:
+    from rich.console import Console
+    from rich.text import TextType
 
 T = TypeVar('T')
 
 
-class HydroConsole(Console):
+class HydroConsole:
+    """
+    rich.console.Console 的轻量外观。
+
+    构造参数原样传递给 Console ，但 rich 只会在真正需要渲染样式、表格等富文本时才被导入。
+    输出不会着色（不是终端，或者禁用了颜色）且内容是不含标记的纯文本时，
+    print() 与 ask() 直接使用内置的 print() 与 input() ，完全不经过 rich 。
+    其余属性与方法都会转交给按需创建的 Console 对象。
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._args = args
+        self._kwargs = kwargs
+        self._console: Console | None = None
+
+    @property
+    def console(self) -> Console:
+        """
+        真正的 rich Console 对象，首次访问时才导入 rich 并创建。
+        """
+        if self._console is None:
+            from rich.console import Console
+            self._console = Console(*self._args, **self._kwargs)
+        return self._console
+
+    def __getattr__(self, name: str):
+        if name in ('_args', '_kwargs', '_console'):
+            raise AttributeError(name)
+        return getattr(self.console, name)
+
+    @property
+    def stream(self) -> TextIO:
+        if self._kwargs.get('file') is not None:
+            return self._kwargs['file']
+        return sys.stderr if self._kwargs.get('stderr') else sys.stdout
+
+    @property
+    def colorless(self) -> bool:
+        """
+        输出是否一定不会着色。此时纯文本不需要经过 rich 渲染。
+        """
+        if self._console is not None or self._args:
+            return False
+        if self._kwargs.keys() - {'stderr', 'file', 'no_color'}:
+            return False
+        if os.environ.get('FORCE_COLOR'):
+            return False
+        if self._kwargs.get('no_color') or os.environ.get('NO_COLOR'):
+            return True
+        try:
+            return not self.stream.isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    @staticmethod
+    def is_plain(obj: Any) -> bool:
+        """
+        是否是不含 rich 标记（markup）和表情代码（emoji）的纯文本。
+        """
+        return type(obj) is str and '[' not in obj and ':' not in obj
+
+    def print(self, *objects, sep: str = ' ', end: str = '\n', **kwargs):
+        # 不会着色时，样式也就没有任何效果
+        if kwargs.keys() <= {'style'} and self.colorless and all(map(self.is_plain, objects)):
+            print(*objects, sep=sep, end=end, file=self.stream, flush=True)
+        else:
+            self.console.print(*objects, sep=sep, end=end, **kwargs)
 
     def warning(self, *objects, **kwargs):
         self.print(*objects, style='yellow', **kwargs)
@@ -24,7 +95,10 @@ class HydroConsole(Console):
             password: bool = False,
             stream: Optional[TextIO] = None,
     ) -> T:
-        if any([style, newline]):
+        if not password and stream is None and self.colorless and self.is_plain(prompt):
+            print(prompt, end='\n' if newline else '', file=self.stream, flush=True)
+            value = input()
+        elif any([style, newline]):
             self.print(
                 prompt,
                 style=style,
@@ -0,0 +1,635 @@
+"""
+行政区划代码数据集的紧凑二进制快照。
+
+JSON 数据集第一次载入时被编译为一份快照，之后直接内存映射快照，不再解析 JSON 。
+源文件的修改时间或大小变化后，快照会自动重新生成。
+
+快照的布局（整数均为本机字节序，各区段按8字节对齐）：
+
+- 文件头：魔数、版本、字节序、源文件的 mtime_ns 与大小、条目数、代码宽度、不同名称的个数、元数据长度
+- 元数据：除 data 以外的字段（title、year 等），JSON 格式
+- 代码：按字典序排列的定宽 ASCII 代码，不足宽度的在末尾补 \\0
+- 名称编号：每个代码对应的名称在名称表中的下标，uint32
+- 名称偏移：每个不同的名称在名称块中的起始位置，uint32 ，最后还有一个结束位置
+- 名称块：所有不同的名称以 UTF-8 编码后连接在一起，相同的名称只存一份
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from collections import defaultdict
+from collections.abc import ItemsView, KeysView, Mapping
+from pathlib import Path
+from typing import Any, Callable, Iterator, NamedTuple, Pattern
+
+MAGIC = b'ADCS'
+VERSION = 1
+HEADER = struct.Struct('=4sHcxqqIIII')  # 魔数、版本、字节序、mtime_ns、大小、条目数、宽度、名称数、元数据长度
+BYTEORDER = sys.byteorder[0].encode('ASCII')
+
+
+class DivisionCode(NamedTuple):
+    """
+    统计用行政区划代码。
+    """
+    province: str
+    prefecture: str = '00'
+    county: str = '00'
+    township: str = '000'
+    village: str = '000'
+
+    def __str__(self):
+        return ''.join(self)
+
+    @classmethod
+    def fromcode(cls, code: str) -> DivisionCode:
+        adc = code.ljust(12, '0')
+        return cls(adc[:2], adc[2:4], adc[4:6], adc[6:9], adc[9:12])
+
+    def code(self, level: int) -> str:
+        return ''.join(self[:level]).ljust(12, '0')
+
+    @property
+    def level(self) -> int:
+        """
+        有效的层级数：省为1，地为2，县为3，乡为4，村为5，全为零时为0。
+        """
+        for level in range(len(self), 0, -1):
+            if self[level - 1].strip('0'):
+                return level
+        return 0
+
+    def prefix(self, level: int) -> str:
+        """
+        前 level 级的代码，不补零。
+        """
+        return ''.join(self[:level])
+
+
+def _pad(n: int) -> int:
+    return -n % 8
+
+
+def stamp(source: Path) -> tuple[int, int]:
+    st = source.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def compile_snapshot(meta: dict[str, Any], data: dict[str, str], source_stamp: tuple[int, int]) -> bytes:
+    """
+    将一份数据集编译为快照。
+
+    :raise ValueError: 代码不是 ASCII 字符串，或名称不是字符串。
+    """
+    keys = sorted(data)
+    if not all(isinstance(k, str) and k.isascii() and '\0' not in k for k in keys):
+        raise ValueError('区划代码只能是 ASCII 字符串。')
+    width = max(map(len, keys), default=0)
+
+    ids = array('I')
+    offsets = array('I', [0])
+    names: dict[str, int] = {}
+    blob = bytearray()
+    for k in keys:
+        name = data[k]
+        if not isinstance(name, str):
+            raise ValueError(f'{k} 的名称应当是一个字符串。')
+        index = names.get(name)
+        if index is None:
+            index = names[name] = len(names)
+            blob += name.encode('UTF-8')
+            offsets.append(len(blob))
+        ids.append(index)
+
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode('UTF-8')
+    key_bytes = ''.join(k.ljust(width, '\0') for k in keys).encode('ASCII')
+    parts = [
+        HEADER.pack(MAGIC, VERSION, BYTEORDER, *source_stamp, len(keys), width, len(names), len(meta_bytes)),
+        meta_bytes,
+        key_bytes,
+        ids.tobytes(),
+        offsets.tobytes(),
+    ]
+    out = bytearray()
+    for part in parts:
+        out += part
+        out += bytes(_pad(len(out)))
+    out += blob
+    return bytes(out)
+
+
+class DivisionTable(Mapping):
+    """
+    快照中 data 字段的只读映射：代码 -> 名称。
+
+    代码按字典序存放，查找时二分查找；遍历时顺序读取，不会为每个条目预先创建 Python 对象。
+    底层的 buffer 可以是内存映射的快照文件，也可以是内存中的 bytes 。
+    """
+
+    def __init__(self, buffer: mmap.mmap | bytes, meta: dict[str, Any] | None = None):
+        self.buffer = buffer
+        view = memoryview(buffer)
+        magic, version, order, _, _, count, width, unique, meta_len = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION or order != BYTEORDER:
+            raise ValueError('快照格式不兼容。')
+        pos = HEADER.size
+        self.meta = json.loads(bytes(view[pos:pos + meta_len])) if meta is None else meta
+        pos += meta_len
+        pos += _pad(pos)
+        self.count = count
+        self.width = width
+        self.keys_start = pos
+        pos += count * width
+        pos += _pad(pos)
+        self.ids = view[pos:pos + count * 4].cast('I')
+        pos += count * 4
+        pos += _pad(pos)
+        self.offsets = view[pos:pos + (unique + 1) * 4].cast('I')
+        pos += (unique + 1) * 4
+        pos += _pad(pos)
+        self.blob_start = pos
+
+    def key_at(self, i: int) -> str:
+        start = self.keys_start + i * self.width
+        return self.buffer[start:start + self.width].rstrip(b'\0').decode('ASCII')
+
+    def name_at(self, i: int) -> str:
+        index = self.ids[i]
+        return self.buffer[self.blob_start + self.offsets[index]:self.blob_start + self.offsets[index + 1]].decode('UTF-8')
+
+    def index(self, code: str) -> int:
+        """
+        代码的下标，不存在时返回 -1 。
+        """
+        if len(code) > self.width or not code.isascii():
+            return -1
+        target = code.encode('ASCII').ljust(self.width, b'\0')
+        i = bisect.bisect_left(_Keys(self), target)
+        return i if i < self.count and _Keys(self)[i] == target else -1
+
+    def prefix_range(self, prefix: str) -> range:
+        """
+        所有以 prefix 开头的代码的下标范围。代码按字典序排列，所以它们是连续的，两次二分查找即可得到。
+        """
+        if not prefix.isascii():
+            return range(0)
+        keys = _Keys(self)
+        target = prefix.encode('ASCII')
+        return range(bisect.bisect_left(keys, target), bisect.bisect_left(keys, target + b'\xff'))
+
+    def __getitem__(self, code: str) -> str:
+        i = self.index(code) if isinstance(code, str) else -1
+        if i < 0:
+            raise KeyError(code)
+        return self.name_at(i)
+
+    def __contains__(self, code: object) -> bool:
+        return isinstance(code, str) and self.index(code) >= 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[str]:
+        width = self.width
+        keys = self.buffer[self.keys_start:self.keys_start + self.count * width].decode('ASCII')
+        for start in range(0, len(keys), width):
+            yield keys[start:start + width].rstrip('\0')
+
+    def keys(self) -> KeysView:
+        return KeysView(self)
+
+    def items(self) -> ItemsView:
+        return _Items(self)
+
+    def pairs(self) -> Iterator[tuple[str, str]]:
+        """
+        按代码的顺序产出所有 (代码, 名称) 。名称按编号解码一次后缓存，重复的名称不会重复解码。
+        """
+        cache: dict[int, str] = {}
+        buffer, offsets, base = self.buffer, self.offsets, self.blob_start
+        for key, index in zip(self, self.ids):
+            name = cache.get(index)
+            if name is None:
+                name = cache[index] = buffer[base + offsets[index]:base + offsets[index + 1]].decode('UTF-8')
+            yield key, name
+
+
+class _Keys:
+    """
+    以 bytes 形式访问第 i 个定宽代码的序列，供 bisect 使用。
+    """
+
+    def __init__(self, table: DivisionTable):
+        self.table = table
+
+    def __len__(self) -> int:
+        return self.table.count
+
+    def __getitem__(self, i: int) -> bytes:
+        start = self.table.keys_start + i * self.table.width
+        return self.table.buffer[start:start + self.table.width]
+
+
+class _Items(ItemsView):
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        return self._mapping.pairs()
+
+
+def open_snapshot(path: Path, source_stamp: tuple[int, int]) -> DivisionTable | None:
+    """
+    内存映射一份快照。快照不存在、格式不兼容或已经过期时返回 None 。
+    """
+    try:
+        with path.open('rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return None
+            magic, version, order, mtime_ns, size, *_ = HEADER.unpack(header)
+            if (magic, version, order) != (MAGIC, VERSION, BYTEORDER) or (mtime_ns, size) != source_stamp:
+                return None
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    return DivisionTable(buffer)
+
+
+def load(source: Path, cache: Path, encoding: str = 'UTF-8') -> dict[str, Any]:
+    """
+    载入一份数据集，返回与 JSON 结构相同的字典，但 data 字段是 DivisionTable 。
+
+    快照有效时直接内存映射；否则解析 JSON ，编译快照并写入 cache 目录。
+    快照无法写入时（例如目录只读，或者 Windows 上旧快照仍被映射）直接使用内存中的快照。
+
+    :raise OSError: 无法读取源文件。
+    :raise ValueError: 源文件格式错误。
+    """
+    source_stamp = stamp(source)
+    path = cache / f'{source.stem}.snapshot'
+    table = open_snapshot(path, source_stamp)
+    if table is None:
+        with source.open('r', encoding=encoding) as f:
+            data = json.load(f)
+        if type(data) is not dict:
+            raise ValueError(f'{source.name} 应当是一个JSON对象。')
+        surplus = {'title', 'year', 'data'} - set(data.keys())
+        if surplus:
+            raise ValueError(f'{source.name} 还应当包含以下字段：' + '、'.join(surplus))
+        if type(data['data']) is not dict:
+            raise ValueError(f'{source.name} 的 data 字段应当是一个JSON对象。')
+        meta = {k: v for k, v in data.items() if k != 'data'}
+        snapshot = compile_snapshot(meta, data['data'], source_stamp)
+        try:
+            cache.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix('.tmp')
+            tmp.write_bytes(snapshot)
+            os.replace(tmp, path)
+        except OSError:
+            table = DivisionTable(snapshot, meta)
+        else:
+            table = open_snapshot(path, source_stamp) or DivisionTable(snapshot, meta)
+    return table.meta | {'data': table}
+
+
+class DivisionIndex:
+    """
+    基于代码层级（省、地、县、乡、村）的前缀索引。
+
+    快照中的代码按字典序排列，并且下级代码只是在上级代码的基础上把末尾的零换成非零，
+    所以每个区划的所有下级都在它之后连续排列，字典序就是整棵树的先序遍历。
+    前缀范围只需两次二分查找；列出直接下级时，每找到一个就跳过它的整棵子树，
+    所以耗时只与结果的数量和总条目数的对数有关，不需要扫描。
+    """
+
+    def __init__(self, table: DivisionTable):
+        self.table = table
+
+    def normalize(self, code: str) -> str:
+        """
+        把任意长度的代码补零或截断为数据集中的代码宽度。
+        """
+        return code.ljust(12, '0')[:self.table.width]
+
+    def descendants(self, code: str) -> range:
+        """
+        所有下级（不含自身）的下标范围。
+        """
+        adc = DivisionCode.fromcode(code)
+        span = self.table.prefix_range(adc.prefix(adc.level))
+        if span and self.table.key_at(span.start) == self.normalize(code):
+            return span[1:]
+        return span
+
+    def children(self, code: str) -> list[int]:
+        """
+        直接下级的下标。某一级缺失时（例如代码直接从地级跳到乡级），以这棵子树中所有最靠上的区划代替。
+        """
+        adc = DivisionCode.fromcode(code)
+        if adc.level >= len(adc):
+            return []
+        span = self.descendants(code)
+        found = []
+        i = span.start
+        while i < span.stop:
+            found.append(i)
+            # 只跳过它自己的子树，缺失的那一级之下的兄弟区划仍会被列出
+            child = DivisionCode.fromcode(self.table.key_at(i))
+            subtree = self.table.prefix_range(child.prefix(child.level))
+            i = max(subtree.stop, i + 1)
+        return found
+
+    def ancestors(self, code: str) -> list[int]:
+        """
+        所有存在于数据集中的上级（不含自身）的下标，从省级开始。
+        """
+        adc = DivisionCode.fromcode(code)
+        found = []
+        for level in range(1, adc.level):
+            if not adc[level - 1].strip('0'):
+                continue  # 这一级的代码段全为零，与上一级是同一个区划
+            i = self.table.index(self.normalize(adc.code(level)))
+            if i >= 0:
+                found.append(i)
+        return found
+
+
+class NameIndex:
+    """
+    区划名称的倒排索引：每个字符及每两个相邻字符（二元组）都对应一个包含它的名称编号列表。
+
+    只为不同的名称建立索引（快照中相同的名称只存一份），再通过名称编号找回所有对应的代码。
+    查询时先求各个二元组的列表的交集得到候选名称，再逐一验证，所以耗时只与候选的数量有关。
+    """
+
+    def __init__(self, table: DivisionTable):
+        self.table = table
+        buffer, offsets, base = table.buffer, table.offsets, table.blob_start
+        self.names = [
+            bytes(buffer[base + offsets[i]:base + offsets[i + 1]]).decode('UTF-8')
+            for i in range(len(offsets) - 1)
+        ]
+        postings: dict[str, array] = {}
+        for nid, name in enumerate(self.names):
+            for gram in {*name, *(name[i:i + 2] for i in range(len(name) - 1))}:
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array('I')
+                posting.append(nid)
+        self.postings = postings
+
+        # 按名称编号对代码下标做计数排序：名称 nid 的所有代码是 codes[starts[nid]:starts[nid + 1]]
+        starts = array('I', bytes(4 * (len(self.names) + 1)))
+        for nid in table.ids:
+            starts[nid + 1] += 1
+        for nid in range(len(self.names)):
+            starts[nid + 1] += starts[nid]
+        codes = array('I', bytes(4 * table.count))
+        cursor = array('I', starts)
+        for i, nid in enumerate(table.ids):
+            codes[cursor[nid]] = i
+            cursor[nid] += 1
+        self.starts = starts
+        self.codes = codes
+
+    def candidates(self, grams: set[str]) -> set[int]:
+        """
+        包含所有 grams 的名称编号。从最短的列表开始求交集。
+        """
+        lists = []
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None:
+                return set()
+            lists.append(posting)
+        lists.sort(key=len)
+        found = set(lists[0])
+        for posting in lists[1:]:
+            found.intersection_update(posting)
+            if not found:
+                break
+        return found
+
+    def search(self, query: str, fuzzy: bool = False) -> list[int]:
+        """
+        查找名称匹配 query 的所有代码，返回按代码排序的下标。
+
+        :param fuzzy: 模糊匹配，即 query 中的字符按顺序出现在名称中即可，中间可以间隔其它字符，
+                      例如“杭西”可以匹配“杭州市西湖区”。否则 query 必须是名称的子串。
+        """
+        if not query:
+            return list(range(self.table.count))
+        if fuzzy:
+            grams = set(query)
+        elif len(query) == 1:
+            grams = {query}
+        else:
+            grams = {query[i:i + 2] for i in range(len(query) - 1)}
+
+        found = []
+        for nid in self.candidates(grams):
+            name = self.names[nid]
+            if fuzzy:
+                chars = iter(name)
+                if not all(c in chars for c in query):
+                    continue
+            elif query not in name:
+                continue
+            found.extend(self.codes[self.starts[nid]:self.starts[nid + 1]])
+        found.sort()
+        return found
+
+
+Predicate = Callable[[str, str], Any]  # (代码, 名称) -> 是否匹配
+
+
+def alternation(patterns: tuple[Pattern[str], ...]) -> Pattern[str]:
+    """
+    把多个正则表达式合并为一个分支，只需匹配一次。
+
+    合并会给后面的表达式中的分组重新编号，使 \\1 之类的反向引用指向错误的分组，而且不会报错，
+    所以只合并不含分组的表达式。含有分组或标志不同时无法合并，抛出 re.error 。
+    """
+    if any(p.groups for p in patterns):
+        raise re.error('含有分组')
+    flags = {p.flags for p in patterns}
+    if len(flags) > 1:
+        raise re.error('标志不同')
+    return re.compile('|'.join(f'(?:{p.pattern})' for p in patterns), flags.pop())
+
+
+def compile_predicate(code: tuple[str, ...],
+                      code_reg: tuple[Pattern[str], ...],
+                      name_reg: tuple[Pattern[str], ...],
+                      every: bool) -> Predicate | None:
+    """
+    把搜索条件编译为一个会短路的判断函数，没有条件时返回 None 。
+
+    子串判断比正则表达式便宜，代码比名称短，所以按代码子串、代码正则、名称正则的顺序判断。
+    并联（every 为 False）时，同一种条件合并为一个正则表达式分支；串联时逐个判断，遇到不匹配立即返回。
+
+    :param code: 代码中应当包含的子串。
+    :param code_reg: 代码应当从开头匹配的正则表达式。
+    :param name_reg: 名称应当从开头匹配的正则表达式。
+    :param every: 是否要求满足所有条件。
+    """
+    tests: list[Predicate] = []
+    if every:
+        tests += [lambda k, v, c=c: c in k for c in code]
+        tests += [lambda k, v, m=p.match: m(k) for p in code_reg]
+        tests += [lambda k, v, m=p.match: m(v) for p in name_reg]
+    else:
+        if len(code) == 1:
+            tests.append(lambda k, v, c=code[0]: c in k)
+        elif code:
+            search = re.compile('|'.join(map(re.escape, code))).search
+            tests.append(lambda k, v: search(k))
+        for patterns, field in ((code_reg, 0), (name_reg, 1)):
+            if not patterns:
+                continue
+            try:
+                matchers = [alternation(patterns).match]
+            except re.error:
+                matchers = [p.match for p in patterns]
+            tests += [(lambda k, v, m=m: m(k)) if field == 0 else (lambda k, v, m=m: m(v)) for m in matchers]
+
+    if not tests:
+        return None
+    if len(tests) == 1:
+        return tests[0]
+    if every:
+        return lambda k, v: all(t(k, v) for t in tests)
+    return lambda k, v: any(t(k, v) for t in tests)
+
+
+class Change(NamedTuple):
+    """
+    两份数据集之间的一处变化。拆分与合并时 new 或 old 是以逗号分隔的多个代码。
+    """
+    kind: str
+    level: int
+    old: str = ''
+    old_name: str = ''
+    new: str = ''
+    new_name: str = ''
+
+
+CHANGES = {
+    'renamed': '更名',
+    'moved': '迁移',
+    'recoded': '改码',
+    'removed': '撤销',
+    'added': '新增',
+    'split': '拆分',
+    'merged': '合并',
+}
+
+
+def parent_of(code: str) -> str:
+    """
+    上一级的代码（补零），省级的上级为空字符串。
+    """
+    adc = DivisionCode.fromcode(code)
+    return adc.code(adc.level - 1)[:len(code)] if adc.level > 1 else ''
+
+
+def diff(old: DivisionTable, new: DivisionTable) -> Iterator[Change]:
+    """
+    比较两份数据集。两边的代码都已按字典序排列，所以只需同时顺序遍历一次（归并连接），耗时与条目数成线性关系。
+
+    代码相同而名称不同的是更名，在遍历过程中立即产出。只在一边出现的代码先暂存，遍历结束后从上往下逐级配对：
+    优先在（配对后的）原上级之下找同一层级的同名区划，找不到时再在全部新增的区划中找唯一的同名区划。
+    配对后上级不同的是迁移，上级相同而代码不同的是改码，配不上的是撤销或新增。
+    随上级一起迁移、本级代码段也没有变化的下级不单独产出。
+
+    最后根据所有换了上级的区划（包括不单独产出的下级）推断拆分与合并：
+    原区划的下级被分到两个以上的新上级时是拆分，新区划的下级来自两个以上的原上级时是合并。
+    原区划仍然存在、且分出的下级中有新设的上级时，它自己也算作一个新上级（从中分设）；
+    新区划原本就存在、且并入的下级中有被撤销的上级时，它自己也算作一个原上级（并入）。
+    """
+    removed: list[tuple[str, str]] = []
+    added: list[tuple[str, str]] = []
+    a, b = old.pairs(), new.pairs()
+    ka, va = next(a, (None, None))
+    kb, vb = next(b, (None, None))
+    while ka is not None and kb is not None:
+        if ka == kb:
+            if va != vb:
+                yield Change('renamed', DivisionCode.fromcode(ka).level, ka, va, kb, vb)
+            ka, va = next(a, (None, None))
+            kb, vb = next(b, (None, None))
+        elif ka < kb:
+            removed.append((ka, va))
+            ka, va = next(a, (None, None))
+        else:
+            added.append((kb, vb))
+            kb, vb = next(b, (None, None))
+    if ka is not None:
+        removed.append((ka, va))
+        removed.extend(a)
+    if kb is not None:
+        added.append((kb, vb))
+        added.extend(b)
+
+    # 新增的区划按 (层级, 名称, 上级) 及 (层级, 名称) 建立索引，已配对的在取用时跳过
+    nearby: dict[tuple[int, str, str], list[str]] = defaultdict(list)
+    anywhere: dict[tuple[int, str], list[str]] = defaultdict(list)
+    for k, v in added:
+        level = DivisionCode.fromcode(k).level
+        nearby[level, v, parent_of(k)].append(k)
+        anywhere[level, v].append(k)
+    paired: dict[str, str] = {}  # 原代码 -> 新代码
+    taken: set[str] = set()
+    spread: dict[str, set[str]] = defaultdict(set)  # 原上级 -> 新上级
+    gather: dict[str, set[str]] = defaultdict(set)  # 新上级 -> 原上级
+    unpaired = []
+    for k, v in sorted(removed, key=lambda item: DivisionCode.fromcode(item[0]).level):
+        adc = DivisionCode.fromcode(k)
+        level = adc.level
+        src = parent_of(k)
+        expect = paired.get(src, src)
+        codes = [c for c in nearby.get((level, v, expect), ()) if c not in taken]
+        if not codes:
+            codes = [c for c in anywhere.get((level, v), ()) if c not in taken]
+            if len(codes) != 1:
+                unpaired.append((k, v, level))
+                continue
+        pick = next((c for c in codes if DivisionCode.fromcode(c)[level - 1] == adc[level - 1]), codes[0])
+        paired[k] = pick
+        taken.add(pick)
+        dst = parent_of(pick)
+        if src != dst:
+            spread[src].add(dst)
+            gather[dst].add(src)
+        if dst != expect:
+            yield Change('moved', level, k, v, pick, v)
+        elif src == dst or pick[len(dst.rstrip('0')):] != k[len(src.rstrip('0')):]:
+            yield Change('recoded', level, k, v, pick, v)
+
+    for k, v, level in sorted(unpaired):
+        yield Change('removed', level, k, v)
+    for k, v in added:
+        if k not in taken:
+            yield Change('added', DivisionCode.fromcode(k).level, new=k, new_name=v)
+
+    def names(table: DivisionTable, codes: list[str]) -> str:
+        return '、'.join(table.get(c) or c for c in codes)
+
+    for code, others in sorted(spread.items()):
+        if code in new and any(c not in old and c not in taken for c in others):
+            others.add(code)
+        if code and len(others) > 1:
+            others = sorted(others)
+            yield Change('split', DivisionCode.fromcode(code).level,
+                         code, old.get(code, ''), ','.join(others), names(new, others))
+    for code, others in sorted(gather.items()):
+        if code in old and any(c not in new and c not in paired for c in others):
+            others.add(code)
+        if code and len(others) > 1:
+            others = sorted(others)
+            yield Change('merged', DivisionCode.fromcode(code).level,
+                         ','.join(others), names(old, others), code, new.get(code, ''))
@@ -0,0 +1,242 @@
+import hashlib
+import itertools
+import multiprocessing
+import os
+import sys
+from array import array
+from collections import deque
+from random import Random, SystemRandom
+from typing import Callable, Iterable, Iterator
+
+from core.streams import BLOCK, Meter, open_sink
+
+# 生成任务：使用给定的随机数生成器生成若干行，返回编码后的数据块
+Task = Callable[[Random, int], bytes]
+
+
+class PooledRandom(SystemRandom):
+    """
+    以 os.urandom 为熵源的密码学安全随机数生成器。
+
+    与 SystemRandom 每次调用都读取一次 os.urandom 不同，
+    它一次读取一大块随机字节放入缓冲池，之后每次调用只从池中切取所需的部分，
+    所以逐行生成少量随机数时也不会有明显的额外开销。
+    random()、choices() 等方法都基于 getrandbits() 与 randbytes() ，同样来自缓冲池。
+    """
+
+    def __init__(self, pool: int = BLOCK):
+        self.pool = pool
+        self.buffer = b''
+        self.offset = 0
+        self.pid = os.getpid()
+        super().__init__()
+
+    def randbytes(self, n: int) -> bytes:
+        if n >= self.pool:
+            return os.urandom(n)
+        end = self.offset + n
+        if end > len(self.buffer):
+            self.buffer = self.buffer[self.offset:] + os.urandom(self.pool)
+            self.offset, end = 0, n
+        data = self.buffer[self.offset:end]
+        self.offset = end
+        return data
+
+    def getrandbits(self, k: int) -> int:
+        if k < 0:
+            raise ValueError('number of bits must be non-negative')
+        size = (k + 7) // 8
+        return int.from_bytes(self.randbytes(size), 'big') >> (size * 8 - k)
+
+    def random(self) -> float:
+        return (int.from_bytes(self.randbytes(7), 'big') >> 3) * 2 ** -53
+
+
+_secure: PooledRandom | None = None
+
+
+def secure_random() -> PooledRandom:
+    """
+    获取当前进程的 PooledRandom 。
+
+    子进程会重新创建一个，以免 fork 出来的进程与父进程共用同一个缓冲池，生成相同的数据。
+    """
+    global _secure
+    if _secure is None or _secure.pid != os.getpid():
+        _secure = PooledRandom()
+    return _secure
+
+
+def derive_seed(seed: int, index: int) -> int:
+    """
+    由主种子和数据块序号派生出相互独立的种子。
+    """
+    digest = hashlib.blake2b(f'{seed}:{index}'.encode('ASCII'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def produce(task: Task, seed: int | None, index: int, count: int, secure: bool = False) -> bytes:
+    """
+    生成第 index 个数据块。没有主种子时使用系统熵源初始化随机数生成器。
+    """
+    if secure:
+        rng = secure_random()
+    elif seed is None:
+        rng = Random()
+    else:
+        rng = Random(derive_seed(seed, index))
+    return task(rng, count)
+
+
+def generate(task: Task,
+             qty: int | None,
+             chunk: int,
+             workers: int = 1,
+             seed: int | None = None,
+             secure: bool = False) -> Iterator[bytes]:
+    """
+    将 qty 行按每 chunk 行划分为多个数据块，依次生成并按顺序产出。
+
+    每个数据块都有独立的、由主种子和块序号派生的种子，
+    所以只要 qty、chunk、seed 相同，无论使用多少个进程，输出都完全一致。
+
+    :param task: 生成任务。使用多进程时必须可以被 pickle ，即定义在模块顶层的函数或它的 partial 。
+    :param qty: 总行数。为 None 时无限地生成下去。
+    :param chunk: 每个数据块包含多少行。
+    :param workers: 进程数。小于等于 1 时在当前进程中生成。
+    :param seed: 主种子。
+    :param secure: 使用密码学安全的随机数生成器，此时忽略主种子。
+    """
+    if qty is None:
+        jobs = ((i, chunk) for i in itertools.count())
+    else:
+        jobs = ((i, min(chunk, qty - start)) for i, start in enumerate(range(0, qty, chunk)))
+    if workers <= 1:
+        for index, count in jobs:
+            yield produce(task, seed, index, count, secure)
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        # 限制同时在途的数据块数目，避免生成速度比写入速度快时占满内存
+        pending = deque()
+        for index, count in jobs:
+            if len(pending) >= workers * 2:
+                yield pending.popleft().get()
+            pending.append(pool.apply_async(produce, (task, seed, index, count, secure)))
+        while pending:
+            yield pending.popleft().get()
+
+
+class Fingerprints:
+    """
+    只记录64位指纹的紧凑集合，用于对大量的行去重。
+
+    使用预先分配好的 array('Q') 作为开放寻址哈希表，每个元素只占8字节（按装载率约为11字节），
+    远小于 Python 的 set 中每个 bytes 或 int 对象的开销。
+    不超过8字节的行直接打包为整数，是精确的；更长的行使用哈希值作为指纹，
+    指纹碰撞只会让一个本来不重复的行被当作重复而丢弃，不会让重复的行混进输出。
+    """
+    MASK = (1 << 64) - 1
+    GOLDEN = 0x9E3779B97F4A7C15
+
+    def __init__(self, capacity: int):
+        """
+        :param capacity: 最多加入多少个指纹。表中始终至少留有一个空位，否则线性探测找不到空位时会无限循环。
+        """
+        bits = max(4, (capacity * 10 // 7).bit_length())  # 装载率不超过 0.7
+        self.shift = 64 - bits
+        self.mask = (1 << bits) - 1
+        self.table = array('Q', [0]) * (1 << bits)
+        self.size = 0
+
+    def add(self, row: bytes) -> bool:
+        """
+        加入一行。已经存在时返回 False 。
+
+        :raise OverflowError: 表已经满了。
+        """
+        # 文本行不含 \0 ，所以不超过8字节时打包出的整数是唯一且非零的
+        fp = int.from_bytes(row, 'big') if len(row) <= 8 else (hash(row) & self.MASK or 1)
+        i = (fp * self.GOLDEN & self.MASK) >> self.shift
+        table = self.table
+        while True:
+            slot = table[i]
+            if slot == 0:
+                if self.size >= self.mask:
+                    raise OverflowError('指纹集合已满。')
+                table[i] = fp
+                self.size += 1
+                return True
+            if slot == fp:
+                return False
+            i = (i + 1) & self.mask
+
+
+def deduplicate(blocks: Iterable[bytes], qty: int) -> Iterator[bytes]:
+    """
+    从源源不断的数据块中筛选出 qty 个互不相同的行，按原顺序以数据块的形式产出。
+
+    凑够 qty 行后立即停止，之后的行不会加入指纹集合，所以集合中最多只有 qty 个指纹。
+    """
+    seen = Fingerprints(qty)
+    need = qty
+    if need <= 0:
+        return
+    for block in blocks:
+        rows = []
+        for row in block.split(b'\n')[:-1]:
+            if seen.add(row):
+                rows.append(row)
+                need -= 1
+                if need <= 0:
+                    break
+        if rows:
+            yield b'\n'.join(rows) + b'\n'
+        if need <= 0:
+            return
+
+
+def check_keyspace(qty: int, keyspace: int) -> str:
+    """
+    检查能否从大小为 keyspace 的键空间中生成 qty 个互不相同的行。
+
+    :return: 一条警告，空字符串表示没有问题。
+    :raise ValueError: 键空间不足，不可能完成。
+    """
+    if qty > keyspace:
+        raise ValueError(f'最多只能生成 {keyspace} 个互不相同的行，但要求生成 {qty} 行。')
+    if qty > keyspace // 2:
+        return f'要求生成的行数已经接近键空间大小（{qty}/{keyspace}），重复会越来越多，生成会越来越慢。'
+    return ''
+
+
+def cpu_workers(workers: int) -> int:
+    """
+    将 0 解释为 CPU 核心数。
+    """
+    return workers if workers > 0 else os.cpu_count() or 1
+
+
+def emit(blocks: Iterable[bytes], output: str | None, once: bool = False) -> Meter | None:
+    """
+    输出所有数据块。
+
+    :param blocks: 以 UTF-8 编码的数据块。
+    :param output: 输出文件路径，- 表示标准输出。为 None 时以文本形式逐块打印到标准输出。
+    :param once: 以文本形式打印时，是否在全部生成后一次性输出。
+    :return: 写入文件时返回吞吐量计量器，否则返回 None 。
+    """
+    if output is None:
+        if once:
+            sys.stdout.write(b''.join(blocks).decode('UTF-8'))
+        else:
+            for block in blocks:
+                sys.stdout.write(block.decode('UTF-8'))
+        sys.stdout.flush()
+        return None
+
+    meter = Meter()
+    with open_sink(output) as sink:
+        for block in blocks:
+            meter.add(sink.write(block))
+    return meter
@@ -0,0 +1,76 @@
+import importlib
+from typing import Any, Callable
+
+import click
+
+from core.console import HydroConsole
+
+
+class LazyGroup(click.Group):
+    """
+    按需导入子指令的指令组。
+
+    子指令通过 “指令名 -> 模块:符号” 的映射表登记，只有在真正调用时才会导入对应的模块，
+    因此调用一个子指令只需要付出这一个模块的导入开销。
+    列出帮助信息时不导入任何模块，而是使用 lazy_meta 提供的元数据（例如指令索引中缓存的 short_help）。
+    """
+
+    def __init__(self,
+                 *args,
+                 lazy_commands: dict[str, str] | None = None,
+                 lazy_meta: Callable[[], dict[str, dict[str, Any]]] | None = None,
+                 **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+        self.lazy_meta = lazy_meta
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted({*super().list_commands(ctx), *self.lazy_commands})
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        if cmd_name in self.commands:
+            return self.commands[cmd_name]
+        if cmd_name in self.lazy_commands:
+            return self.load(cmd_name)
+        return None
+
+    def load(self, cmd_name: str) -> click.Command:
+        """
+        导入子指令所在的模块并取出指令对象，之后缓存在 commands 中。无法导入时输出警告并退出。
+        """
+        module_name, _, attr = self.lazy_commands[cmd_name].partition(':')
+        try:
+            cmd = getattr(importlib.import_module(module_name), attr)
+        except Exception as e:
+            HydroConsole(stderr=True).warning(f'无法载入指令 {cmd_name}（{module_name}:{attr}）。{type(e).__name__}: {e}')
+            exit(-1)
+        if not isinstance(cmd, click.Command):
+            HydroConsole(stderr=True).warning(f'{module_name}:{attr} 不是一个 click.Command 对象。')
+            exit(-1)
+        self.commands[cmd_name] = cmd
+        return cmd
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter):
+        """
+        列出所有子指令及其简介。尚未导入的子指令使用 lazy_meta 中的元数据，不会因此导入模块。
+        """
+        names = self.list_commands(ctx)
+        if not names:
+            return
+        meta = self.lazy_meta() if self.lazy_meta is not None and self.lazy_commands.keys() - self.commands.keys() else {}
+        limit = formatter.width - 6 - max(map(len, names))
+
+        rows = []
+        for name in names:
+            cmd = self.commands.get(name)
+            if cmd is not None:
+                if not cmd.hidden:
+                    rows.append((name, cmd.get_short_help_str(limit)))
+                continue
+            info = meta.get(name, {})
+            if not info.get('hidden'):
+                rows.append((name, info.get('short_help') or ''))
+
+        if rows:
+            with formatter.section('Commands'):
+                formatter.write_dl(rows)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from array import array
+from collections import Counter
+from functools import lru_cache
+from math import log, log2
+from typing import TYPE_CHECKING, BinaryIO
+
+from core.streams import BLOCK
+
+if TYPE_CHECKING:
+    from rich.text import Text
+
+HEATMAP = ('bright_black', 'blue', 'cyan', 'green', 'yellow', 'bright_red')
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """
+    第一次计数时才导入 NumPy ，没有安装时返回 None 。NumPy 的导入开销较大，不应由用不到直方图的指令承担。
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class ByteHistogram:
+    """
+    由256个计数器组成的字节频数直方图。
+
+    数据按块累加，内存占用恒定。每一块都在C代码中计数（安装了 NumPy 时使用 bincount ，
+    否则使用 Counter 的C实现），再合并到定长的 array('Q') 中。
+    """
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * 256))
+        self.total = 0
+
+    def update(self, chunk: bytes):
+        if not chunk:
+            return
+        numpy = _numpy()
+        if numpy is not None:
+            bins = numpy.bincount(numpy.frombuffer(chunk, dtype=numpy.uint8), minlength=256)
+            for b in numpy.flatnonzero(bins).tolist():
+                self.counts[b] += int(bins[b])
+        else:
+            for b, n in Counter(chunk).items():
+                self.counts[b] += n
+        self.total += len(chunk)
+
+    def consume(self, source: BinaryIO, size: int = BLOCK):
+        """
+        读取整个输入并计数。
+        """
+        while chunk := source.read(size):
+            self.update(chunk)
+
+    def __contains__(self, b: int) -> bool:
+        return self.counts[b] > 0
+
+    @property
+    def peak(self) -> int:
+        return max(self.counts)
+
+    def entropy(self) -> float:
+        """
+        香农熵，单位是比特每字节，取值范围是 0~8 。
+        """
+        if not self.total:
+            return 0.0
+        return -sum(n / self.total * log2(n / self.total) for n in self.counts if n)
+
+
+def compact(n: int) -> str:
+    """
+    将计数压缩为不超过3个字符，例如 999、1k2、34M、.5G 。
+
+    小数点用单位代替（1k2 即 1.2k），数值在百位时写作下一个单位的小数（.5M 即 500k），
+    这样计数表每行16个单元格加上分隔符也不超过 80 列。
+    """
+    if n < 1000:
+        return str(n)
+    units = ('k', 'M', 'G', 'T', 'P', 'E')  # 64位计数最多约为 18E
+    value = float(n)
+    for i, unit in enumerate(units):
+        value /= 1000
+        if value < 9.95:
+            tenths = int(value * 10 + 0.5)
+            return f'{tenths // 10}{unit}{tenths % 10}'
+        if value < 99.5 or i + 1 == len(units):
+            return f'{int(value + 0.5)}{unit}'
+        if value < 950:
+            return f'.{int(value / 100 + 0.5)}{units[i + 1]}'
+
+
+def heat_of(n: int, peak: int) -> str:
+    """
+    按对数比例将计数映射为热力图的颜色。
+    """
+    if not n:
+        return HEATMAP[0]
+    level = 1 + int(log(n) / log(peak) * (len(HEATMAP) - 2)) if peak > 1 else len(HEATMAP) - 1
+    return HEATMAP[min(level, len(HEATMAP) - 1)]
+
+
+class ByteGrid:
+    """
+    16×16 字节分布表的渲染缓存。
+
+    表格的文本骨架（所有单元格和分隔符）以及每个单元格的位置只计算一次，
+    每次渲染只需要在一个覆盖全文的暗色样式之上，为出现过的字节追加样式区间，
+    不必再为256个单元格分别创建 Text 对象并拼接。
+    同一个对象可以反复渲染，例如在读取数据流的同时实时刷新。
+    """
+
+    def __init__(self, width: int = 2):
+        """
+        :param width: 单元格宽度。2 用于显示字节本身，3 用于显示计数。
+        """
+        from rich.text import Span
+
+        self.width = width
+        row = 16 * width + 15  # 每行的长度，不含换行符
+        self.offsets = [j * (row + 1) + i * (width + 1) for j in range(16) for i in range(16)]
+        self.skeleton = self.layout([f'{b:02x}'.rjust(width) for b in range(256)])
+        self.background = Span(0, len(self.skeleton), HEATMAP[0])
+
+    @staticmethod
+    def layout(labels: list[str]) -> str:
+        return '\n'.join(','.join(labels[j * 16:j * 16 + 16]) for j in range(16))
+
+    def render(self, histogram: ByteHistogram, count: bool = False, heat: bool = False) -> Text:
+        """
+        渲染直方图。
+
+        :param histogram: 直方图。
+        :param count: 显示计数而不是字节本身，此时单元格宽度应当是3。
+        :param heat: 按计数以热力图着色，否则只区分出现过与未出现过。
+        """
+        from rich.text import Span, Text
+
+        counts = histogram.counts
+        if count:
+            plain = self.layout([compact(n).rjust(self.width) for n in counts])
+        else:
+            plain = self.skeleton
+        peak = histogram.peak
+        spans = [self.background]
+        for b, offset in enumerate(self.offsets):
+            if n := counts[b]:
+                style = heat_of(n, peak) if heat else 'white'
+                spans.append(Span(offset, offset + self.width, style))
+        return Text(plain, spans=spans)
+
+
+@lru_cache(maxsize=4)
+def byte_grid(width: int = 2) -> ByteGrid:
+    """
+    获取某个单元格宽度的 ByteGrid ，同一个进程中只会构建一次。
+    """
+    return ByteGrid(width)
@@ -0,0 +1,222 @@
+import importlib.util
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Iterable, NamedTuple
+
+VERSION = 1
+ROOT = Path(__file__).absolute().parent.parent  # 项目根目录
+MARK = '\0shulker-probe\0'  # 子进程输出的报告行的前缀，与脚本自己的输出区分开
+
+
+def scan(src: Path) -> list[dict[str, Any]]:
+    """
+    动态导入并执行某个python脚本，获取其中所有指令的元数据。
+
+    当存在基于 click.Group 的类时只获取它，否则获取所有基于 click.Command 的类。
+    """
+    # 根据绝对路径导入源码并运行
+    # 相当于 from (src.parent) import (src) as module
+    spec = importlib.util.spec_from_file_location(src.name, src)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[src.name] = module
+    spec.loader.exec_module(module)
+
+    # 脚本自己会导入 click ，所以这里的导入不计入脚本的耗时
+    import click
+
+    # 获取源码中 click.Command 的所有子类，
+    # 然后过滤出 click.Group 的子类，
+    # 最后，如果有后者就选择后者，否则选择前者。
+    # 因为如果使用了 click.Group ，
+    # click是不会再将 click.Command 显示出来的。
+    cmds = [(k, v) for k, v in module.__dict__.items() if isinstance(v, click.Command)]
+    groups = [(k, v) for k, v in cmds if isinstance(v, click.Group)]
+    return [
+        dict(
+            attr=attr,
+            # 命令名默认是被装饰的函数名，这里改成文件名做到调用与声明一致
+            name=str(cmd.name).replace('.py', '', 1),
+            short_help=cmd.short_help,
+            hidden=cmd.hidden,
+            deprecated=cmd.deprecated,
+        )
+        for attr, cmd in (groups if groups else cmds)
+    ]
+
+
+class Report(NamedTuple):
+    """
+    单个脚本的扫描报告。
+    """
+    src: Path
+    commands: list[dict[str, Any]] | None
+    elapsed: float | None
+    error: str = ''
+
+
+def probe(src: Path) -> Report:
+    """
+    扫描某个脚本并计时。脚本退出或抛出异常时不会向外传播，而是记录在报告中；但 KeyboardInterrupt 会照常中止扫描。
+    """
+    start = time.perf_counter()
+    try:
+        commands = scan(src)
+    except SystemExit as e:
+        return Report(src, None, time.perf_counter() - start, f'脚本已退出（{e.code}）')
+    except Exception as e:
+        return Report(src, None, time.perf_counter() - start, f'{type(e).__name__}: {e}')
+    return Report(src, commands, time.perf_counter() - start)
+
+
+def probe_isolated(src: Path, timeout: float) -> Report:
+    """
+    在一个全新的解释器中扫描某个脚本。
+
+    每个脚本都独自承担它的全部导入开销（click、rich、core 等），不会因为排在后面而沾了前面的脚本的光，
+    所以报告中的耗时可以互相比较。超时的子进程会被终止。
+    """
+    try:
+        proc = subprocess.run(
+            [sys.executable, '-m', 'core.indexer', str(src)],
+            cwd=ROOT, capture_output=True, timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return Report(src, None, None, f'超时（{timeout}s）')
+    for line in reversed(proc.stdout.decode('UTF-8', 'replace').splitlines()):
+        if line.startswith(MARK):
+            data = json.loads(line[len(MARK):])
+            return Report(src, data['commands'], data['elapsed'], data['error'])
+    lines = proc.stderr.decode('UTF-8', 'replace').strip().splitlines()
+    return Report(src, None, None, lines[-1] if lines else f'子进程异常退出（{proc.returncode}）')
+
+
+def probe_all(sources: list[Path], jobs: int, timeout: float) -> list[Report]:
+    """
+    扫描多个脚本。
+
+    :param sources: 需要扫描的脚本。
+    :param jobs: 同时运行的子进程数。为 0 时在当前进程中逐个扫描，否则每个脚本都在一个全新的子进程中隔离扫描。
+    :param timeout: 每个子进程的超时秒数，超时的脚本会连同其进程一并终止。
+    """
+    if jobs < 1:
+        return [probe(src) for src in sources]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    # 真正的工作都在子进程中，线程只负责等待
+    with ThreadPoolExecutor(min(jobs, len(sources)) or 1) as pool:
+        return list(pool.map(lambda src: probe_isolated(src, timeout), sources))
+
+
+class CommandIndex:
+    """
+    持久化的指令元数据索引。
+
+    以文件路径为键，记录每个脚本的修改时间（mtime）和大小，
+    只有当两者之一发生变化时，才需要重新执行脚本以获取元数据。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.reports: list[Report] = []
+        self.dirty = False
+
+    def load(self) -> 'CommandIndex':
+        """
+        一次性读取整个索引文件。文件不存在或已损坏时视为空索引。
+        """
+        try:
+            with self.path.open('r', encoding='UTF-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if isinstance(data, dict) and data.get('version') == VERSION:
+            self.entries = data.get('entries', {})
+        return self
+
+    def save(self):
+        """
+        将索引写回磁盘。没有发生变化时什么都不做。
+        """
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_suffix('.tmp')
+        with temp.open('w', encoding='UTF-8') as f:
+            json.dump(dict(version=VERSION, entries=self.entries), f, ensure_ascii=False)
+        temp.replace(self.path)
+        self.dirty = False
+
+    @staticmethod
+    def stamp(src: Path) -> tuple[int, int]:
+        stat = src.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def is_fresh(self, src: Path) -> bool:
+        """
+        判断某个脚本的索引条目是否仍然有效。
+        """
+        entry = self.entries.get(str(src))
+        return entry is not None and (entry['mtime'], entry['size']) == self.stamp(src)
+
+    def get(self, src: Path) -> list[dict[str, Any]]:
+        return self.entries[str(src)]['commands']
+
+    def put(self, src: Path, commands: list[dict[str, Any]]):
+        mtime, size = self.stamp(src)
+        self.entries[str(src)] = dict(mtime=mtime, size=size, commands=commands)
+        self.dirty = True
+
+    def by_name(self) -> dict[str, dict[str, Any]]:
+        """
+        以指令名为键的元数据，只读取已有的索引，不扫描任何脚本。条目可能已经过期，只适合用于显示帮助信息。
+        """
+        return {cmd['name']: cmd for entry in self.entries.values() for cmd in entry['commands']}
+
+    def prune(self, sources: Iterable[Path]):
+        """
+        删除已经不存在的脚本的条目。
+        """
+        alive = set(map(str, sources))
+        for key in [k for k in self.entries if k not in alive]:
+            del self.entries[key]
+            self.dirty = True
+
+    def update(self,
+               sources: Iterable[Path],
+               jobs: int = 0,
+               timeout: float = 10,
+               force: bool = False) -> list[dict[str, Any]]:
+        """
+        只重新扫描发生变化的脚本，然后返回所有脚本的指令元数据。
+
+        扫描失败的脚本不会写入索引，下次仍会重新扫描。每个被扫描的脚本的报告记录在 reports 中。
+
+        :param sources: 所有脚本。
+        :param jobs: 扫描所用的进程数，为 0 时在当前进程中扫描。
+        :param timeout: 进程池中每个脚本的超时秒数。
+        :param force: 无视索引，重新扫描所有脚本。
+        """
+        sources = list(sources)
+        self.prune(sources)
+        stale = [src for src in sources if force or not self.is_fresh(src)]
+        self.reports = probe_all(stale, jobs, timeout) if stale else []
+        for report in self.reports:
+            if report.commands is not None:
+                self.put(report.src, report.commands)
+        self.save()
+        return [
+            cmd
+            for src in sources if str(src) in self.entries
+            for cmd in self.get(src)
+        ]
+
+
+if __name__ == '__main__':
+    # 供 probe_isolated() 在子进程中调用：python -m core.indexer SCRIPT
+    report = probe(Path(sys.argv[1]))
+    print(MARK + json.dumps(dict(commands=report.commands, elapsed=report.elapsed, error=report.error)), flush=True)
@@ -0,0 +1,180 @@
+import codecs
+import sys
+import time
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Iterator
+
+BLOCK = 1 << 20  # 默认块大小 1MiB
+BATCH = 1 << 16  # 按行处理时，每批写入的行数
+
+
+@contextmanager
+def open_source(path: str | None, buffering: int = BLOCK) -> Iterator[BinaryIO]:
+    """
+    打开一个二进制输入。路径为 None 或 "-" 时使用标准输入，退出时不关闭。
+    """
+    if path is None or path == '-':
+        yield sys.stdin.buffer
+    else:
+        with open(path, 'rb', buffering=buffering) as f:
+            yield f
+
+
+@contextmanager
+def open_sink(path: str | None, buffering: int = BLOCK) -> Iterator[BinaryIO]:
+    """
+    打开一个二进制输出。路径为 None 或 "-" 时使用标准输出，退出时只刷新而不关闭。
+    """
+    if path is None or path == '-':
+        sys.stdout.flush()
+        yield sys.stdout.buffer
+        sys.stdout.buffer.flush()
+    else:
+        with open(path, 'wb', buffering=buffering) as f:
+            yield f
+
+
+def human_size(size: float) -> str:
+    """
+    将字节数转换为便于阅读的形式，例如 1.5 MiB 。
+    """
+    for unit in ('B', 'KiB', 'MiB', 'GiB', 'TiB'):
+        if size < 1024 or unit == 'TiB':
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+
+
+class Meter:
+    """
+    吞吐量计量器。从创建时开始计时，累计处理的字节数。
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.total = 0
+
+    def add(self, size: int) -> int:
+        self.total += size
+        return size
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def report(self) -> str:
+        elapsed = self.elapsed
+        rate = self.total / elapsed if elapsed > 0 else 0
+        return f'{human_size(self.total)}，耗时 {elapsed:.2f}s，{human_size(rate)}/s'
+
+
+def repeat(data: bytes, times: int, sink: BinaryIO, size: int = BLOCK) -> int:
+    """
+    将 data 重复 times 次写入输出。每次写入约 size 字节的整块，内存占用与重复次数无关。
+
+    :return: 写入的字节数。
+    """
+    if not data or times <= 0:
+        return 0
+    per = max(1, size // len(data))  # 每一块包含多少份 data
+    block = data * min(per, times)
+    full, rest = divmod(times, per)
+    for _ in range(full):
+        sink.write(block)
+    if rest:
+        sink.write(data * rest)
+    return len(data) * times
+
+
+def transform_lines(transform: Callable[[bytes], bytes],
+                    source: BinaryIO,
+                    sink: BinaryIO,
+                    on_error: Callable[[int, Exception], None]) -> int:
+    """
+    逐行转换输入，按原顺序分批写入输出。
+
+    无法转换（抛出 ValueError）的行会交给 on_error 处理并输出一个空行，以保持输入输出的行号一一对应。
+
+    :param transform: 转换函数，输入和输出都不含换行符。
+    :param source: 输入。
+    :param sink: 输出。
+    :param on_error: 错误处理函数，参数是从1开始的行号及异常。
+    :return: 处理的行数。
+    """
+    batch = []
+    lineno = 0
+    for lineno, line in enumerate(source, start=1):
+        try:
+            batch.append(transform(line.rstrip(b'\r\n')))
+        except ValueError as e:
+            on_error(lineno, e)
+            batch.append(b'')
+        if len(batch) >= BATCH:
+            sink.write(b'\n'.join(batch) + b'\n')
+            batch.clear()
+    if batch:
+        sink.write(b'\n'.join(batch) + b'\n')
+    return lineno
+
+
+def convert_lines(convert: Callable[[bytes], bytes],
+                  source: str | None,
+                  output: str | None,
+                  encoding: str,
+                  decode: bool,
+                  failure: str = '格式错误'):
+    """
+    将输入的每一行当作一条独立的字符串，逐行编码或解码，在标准错误中报告无法转换的行及吞吐量。
+
+    输入与输出都按 UTF-8 处理；编码前先将字符串按 encoding 编码，解码后再按 encoding 解码，
+    解码出的字节不是合法的 encoding 字符串时同样算作无法转换，输出为空行。
+
+    :param convert: 编码时把原始字节转换为编码结果，解码时把编码结果还原为原始字节。无法转换时抛出 ValueError 。
+    :param source: 输入文件，None 或 - 表示标准输入。
+    :param output: 输出文件，None 或 - 表示标准输出。
+    :param encoding: 字符串编码。
+    :param decode: 是否是解码。
+    :param failure: 报告无法转换的行时使用的说法。
+    """
+    from core.console import HydroConsole
+
+    console = HydroConsole(stderr=True)
+    try:
+        native = codecs.lookup(encoding).name == 'utf-8'
+    except LookupError:
+        console.warning('无法识别的编码', encoding)
+        exit(-1)
+
+    if decode and native:
+        def transform(record: bytes) -> bytes:
+            data = convert(record)
+            data.decode('UTF-8')  # 校验
+            return data
+    elif decode:
+        def transform(record: bytes) -> bytes:
+            return convert(record).decode(encoding).encode('UTF-8')
+    elif native:
+        transform = convert
+    else:
+        def transform(record: bytes) -> bytes:
+            return convert(record.decode('UTF-8').encode(encoding))
+
+    errors = 0
+
+    def report(lineno: int, error: Exception):
+        nonlocal errors
+        errors += 1
+        console.warning(f'第 {lineno} 行{failure}：{error}')
+
+    meter = Meter()
+    try:
+        with open_source(source) as src, open_sink(output) as sink:
+            lines = transform_lines(transform, src, sink, report)
+            if output not in (None, '-'):
+                meter.add(sink.tell())
+    except OSError as e:
+        console.warning(str(e))
+        exit(-1)
+    if errors:
+        console.warning(f'共 {lines} 行，其中 {errors} 行{failure}。')
+    if output not in (None, '-'):
+        console.print(f'已处理 {lines} 行，写入 {meter.report()}')
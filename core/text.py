@@ -0,0 +1,132 @@
+import codecs
+import unicodedata
+from functools import lru_cache
+from typing import BinaryIO, NamedTuple
+
+from core.streams import BLOCK
+
+try:
+    import regex
+except ImportError:
+    regex = None
+
+ZWJ = '\u200d'
+
+
+@lru_cache(maxsize=4096)
+def is_extender(char: str) -> bool:
+    """
+    是否是附着在前一个字符上、不单独构成字素簇的字符：组合用字符、零宽连接符、变体选择符、肤色修饰符等。
+    """
+    if char == ZWJ or '\U0001f3fb' <= char <= '\U0001f3ff':
+        return True
+    return unicodedata.category(char) in ('Mn', 'Me', 'Mc')
+
+
+def is_regional(char: str) -> bool:
+    return '\U0001f1e6' <= char <= '\U0001f1ff'
+
+
+class GraphemeCounter:
+    """
+    增量地统计字素簇（用户感知的字符）个数。
+
+    安装了 regex 时使用 Unicode 标准的 \\X 切分；否则使用基于 unicodedata 的近似规则：
+    组合用字符等附着在前一个字符上，零宽连接符把前后两个字符连为一体，CR LF 和一对区域指示符各算作一个。
+
+    字素簇可能跨越两次输入的边界，所以每次都把最后一个字素簇留到下一次再统计。
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.carry = ''
+
+    def feed(self, text: str):
+        text = self.carry + text if self.carry else text
+        if not text:
+            return
+        if regex is not None:
+            clusters = regex.findall(r'\X', text)
+            self.count += len(clusters) - 1
+            self.carry = clusters[-1]
+            return
+        start = self.last_start(text)
+        self.count += self.approximate(text[:start])
+        self.carry = text[start:]
+
+    def finish(self) -> int:
+        """
+        统计留下的最后一个字素簇，并返回总数。
+        """
+        if self.carry:
+            self.count += len(regex.findall(r'\X', self.carry)) if regex is not None else self.approximate(self.carry)
+            self.carry = ''
+        return self.count
+
+    @staticmethod
+    def last_start(text: str) -> int:
+        """
+        按近似规则找到最后一个字素簇的起始位置。
+        """
+        i = len(text) - 1
+        while i > 0:
+            char, prev = text[i], text[i - 1]
+            if not (is_extender(char) or prev == ZWJ or prev + char == '\r\n' or
+                    is_regional(prev) and is_regional(char)):
+                break
+            i -= 1
+        return i
+
+    @staticmethod
+    def approximate(text: str) -> int:
+        """
+        按近似规则统计字素簇个数。只对不同的字符逐个判断，再用 str.count 计数，绝大部分工作都在C代码中完成。
+        """
+        count = len(text)
+        regional = 0
+        for char in set(text):
+            if is_extender(char):
+                count -= text.count(char)
+            elif is_regional(char):
+                regional += text.count(char)
+        # 零宽连接符本身已经扣除，它连接的后一个字符也不单独成簇
+        return count - text.count(ZWJ) - text.count('\r\n') - regional // 2
+
+
+class Length(NamedTuple):
+    bytes: int
+    chars: int
+    graphemes: int
+
+
+def measure(text: str, encoding: str = 'UTF-8') -> Length:
+    """
+    测量一个字符串。
+
+    :raise LookupError: 无法识别的编码。
+    :raise UnicodeEncodeError: 无法编码。
+    """
+    counter = GraphemeCounter()
+    counter.feed(text)
+    return Length(len(text.encode(encoding)), len(text), counter.finish())
+
+
+def measure_stream(source: BinaryIO, encoding: str = 'UTF-8', size: int = BLOCK) -> Length:
+    """
+    以恒定的内存流式测量输入。使用增量解码器，多字节字符跨越两块的边界也能正确解码。
+
+    :raise LookupError: 无法识别的编码。
+    :raise UnicodeDecodeError: 无法解码。
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    counter = GraphemeCounter()
+    total = chars = 0
+    while chunk := source.read(size):
+        total += len(chunk)
+        text = decoder.decode(chunk)
+        chars += len(text)
+        counter.feed(text)
+    text = decoder.decode(b'', final=True)
+    chars += len(text)
+    counter.feed(text)
+    return Length(total, chars, counter.finish())
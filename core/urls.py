@@ -0,0 +1,171 @@
+import json
+from collections import Counter
+from functools import lru_cache
+from typing import BinaryIO, Iterable, Iterator, NamedTuple
+from urllib.parse import parse_qsl, quote_from_bytes, unquote_to_bytes, urlsplit
+
+from core.streams import BLOCK
+
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
+FIELDS = ('url', 'scheme', 'host', 'port', 'username', 'password', 'path', 'query', 'fragment')
+
+
+class ParsedURL(NamedTuple):
+    url: str
+    scheme: str
+    host: str | None
+    port: int | None
+    username: str | None
+    password: str | None
+    path: str
+    query: str
+    fragment: str
+    params: tuple[tuple[str, str], ...]
+
+    def to_json(self) -> str:
+        record = dict(zip(FIELDS, self))
+        # 同名参数可以出现多次，所以每个参数名都对应一个值的列表
+        query: dict[str, list[str]] = {}
+        for k, v in self.params:
+            query.setdefault(k, []).append(v)
+        record['query'] = query
+        return _encode_json(record)
+
+    def to_row(self) -> tuple:
+        return self[:len(FIELDS)]
+
+
+@lru_cache(maxsize=1 << 16)
+def parse(url: str, encoding: str = 'UTF-8', allow_fragments: bool = True) -> ParsedURL:
+    """
+    解析一条URL。访问日志中的URL大量重复，所以结果会被缓存。
+
+    :raise ValueError: 无法解析，例如方括号不匹配或端口号不是数字。
+    """
+    info = urlsplit(url, allow_fragments=allow_fragments)
+    params = query_params(info.query, encoding) if info.query else ()
+    return ParsedURL(
+        url, info.scheme, info.hostname, info.port, info.username, info.password,
+        info.path, info.query, info.fragment, params,
+    )
+
+
+@lru_cache(maxsize=1 << 16)
+def query_params(query: str, encoding: str = 'UTF-8') -> tuple[tuple[str, str], ...]:
+    """
+    解析查询字符串。不同的URL常常带有相同的查询字符串，所以单独缓存。
+    """
+    return tuple(parse_qsl(query, encoding=encoding))
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_json(url: str, encoding: str = 'UTF-8', allow_fragments: bool = True) -> str:
+    """
+    解析一条URL并序列化为一行 JSON ，同样按URL缓存。
+
+    :raise ValueError: 无法解析。
+    """
+    return parse(url, encoding, allow_fragments).to_json()
+
+
+def extract(line: str, field: int | None = None) -> str:
+    """
+    从一行中取出URL。field 从1开始，表示按空白分割后的第几个字段，为 None 时取整行。
+    """
+    if field is None:
+        return line.strip()
+    parts = line.split()
+    return parts[field - 1].strip('"') if len(parts) >= field else ''
+
+
+def read_urls(lines: Iterable[str], field: int | None = None) -> Iterator[tuple[int, str]]:
+    """
+    逐行取出URL，跳过空行。
+
+    :return: 从1开始的行号及URL。
+    """
+    for lineno, line in enumerate(lines, start=1):
+        if url := extract(line, field):
+            yield lineno, url
+
+
+class Aggregate:
+    """
+    按主机、路径、查询参数名分别计数。
+    """
+    KINDS = ('host', 'path', 'query')
+
+    def __init__(self):
+        self.counters = {kind: Counter() for kind in self.KINDS}
+
+    def add(self, parsed: ParsedURL):
+        self.counters['host'][parsed.host or ''] += 1
+        self.counters['path'][parsed.path] += 1
+        # 同一条URL中重复出现的参数名只计一次
+        self.counters['query'].update({k for k, _ in parsed.params})
+
+    def rows(self, top: int | None = None) -> Iterator[tuple[str, str, int]]:
+        """
+        按种类依次产出 (种类, 键, 次数) ，每一种都按次数从多到少排列。
+        """
+        for kind in self.KINDS:
+            for key, count in self.counters[kind].most_common(top):
+                yield kind, key, count
+
+    def to_json(self, top: int | None = None) -> Iterator[str]:
+        """
+        与 rows() 相同，但每一条都序列化为一行 JSON 。
+        """
+        for kind, key, count in self.rows(top):
+            yield _encode_json({'kind': kind, 'key': key, 'count': count})
+
+
+def quote_bytes(data: bytes, plus: bool = False) -> bytes:
+    """
+    URL编码原始字节，与 quote() 与 quote_plus() 的规则相同。
+    """
+    if plus:
+        return quote_from_bytes(data, ' ').replace(' ', '+').encode('ASCII')
+    return quote_from_bytes(data).encode('ASCII')
+
+
+def unquote_bytes(data: bytes, plus: bool = False) -> bytes:
+    """
+    URL解码为原始字节，与 unquote() 与 unquote_plus() 的规则相同。
+    """
+    return unquote_to_bytes(data.replace(b'+', b' ') if plus else data)
+
+
+def quote_stream(source: BinaryIO, sink: BinaryIO, plus: bool = False, size: int = BLOCK) -> int:
+    """
+    以恒定的内存流式编码。每个字节都独立编码，所以可以任意分块。最后输出一个换行符。
+
+    :return: 读取的字节数。
+    """
+    total = 0
+    while chunk := source.read(size):
+        total += len(chunk)
+        sink.write(quote_bytes(chunk, plus))
+    sink.write(b'\n')
+    return total
+
+
+def unquote_stream(source: BinaryIO, sink: BinaryIO, plus: bool = False, size: int = BLOCK) -> int:
+    """
+    以恒定的内存流式解码。%XX 可能被块的边界截断，所以末尾不完整的 % 序列会留到与下一块拼接后再解码。
+
+    :return: 读取的字节数。
+    """
+    total = 0
+    carry = b''
+    while chunk := source.read(size):
+        total += len(chunk)
+        data = carry + chunk if carry else chunk
+        cut = data.find(b'%', len(data) - 2)
+        if cut < 0:
+            cut = len(data)
+        carry = data[cut:]
+        sink.write(unquote_bytes(data[:cut], plus))
+    sink.write(unquote_bytes(carry, plus))
+    return total
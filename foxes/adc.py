@@ -15,22 +15,26 @@
 """
 from __future__ import annotations
 
-import json
-import re
+import itertools
+from collections import Counter
 from pathlib import Path
-from typing import NamedTuple, Pattern
+from typing import Iterator, Pattern
 
 import click
 from rich import box
+from rich.status import Status
 from rich.table import Table
 from rich.text import Text
 from rich.tree import Tree
 
+from core import divisions
+from core.divisions import DivisionCode, DivisionIndex, DivisionTable, NameIndex, compile_predicate
 from core.param_types import Regex
 from fox import FoxLoop
 
 root = Path(__file__).absolute().parent.parent
 datapack = root / 'dataset' / 'codes'
+snapshots = datapack / '__pycache__'  # 编译好的快照，参见 core.divisions
 
 
 def get_files(shell: FoxLoop, filename: str | None) -> tuple[str]:
@@ -56,28 +60,6 @@ def get_files(shell: FoxLoop, filename: str | None) -> tuple[str]:
         raise
 
 
-class DivisionCode(NamedTuple):
-    """
-    统计用行政区划代码。
-    """
-    province: str
-    prefecture: str = '00'
-    county: str = '00'
-    township: str = '000'
-    village: str = '000'
-
-    def __str__(self):
-        return ''.join(self)
-
-    @classmethod
-    def fromcode(cls, code: str) -> DivisionCode:
-        adc = code.ljust(12, '0')
-        return cls(adc[:2], adc[2:4], adc[4:6], adc[6:9], adc[9:12])
-
-    def code(self, level: int) -> str:
-        return ''.join(self[:level]).ljust(12, '0')
-
-
 @click.group(__name__, short_help='行政区划代码相关')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
 def manager():
@@ -127,6 +109,12 @@ def loader(shell: FoxLoop,
            skip_reload: bool,
            encoding: str,
            yes: bool):
+    """
+    载入数据集。
+
+    每份 JSON 第一次载入时会被编译为紧凑的二进制快照，存放在数据目录的 __pycache__ 中，
+    之后直接内存映射快照。JSON 文件被修改后快照会自动重新生成。
+    """
     shell.contexts.setdefault('ADC', {})
     if not datapack.is_dir():
         shell.warning(f'数据目录不存在：{datapack!s}')
@@ -149,30 +137,50 @@ def loader(shell: FoxLoop,
 
         with shell.stderr.status(f'正在载入 {fp}', spinner='bouncingBar'):
             try:
-                data = json.load(fp.open('r', encoding=encoding))
-            except Exception as e:
-                shell.stderr.print_exception(e)
-
-        # 验证文件格式
-        if type(data) is not dict:
-            shell.warning(f'文件格式错误。{datafile} 应当是一个JSON对象。')
-            continue
-        surplus = {'title', 'year', 'data'} - set(data.keys())
-        if surplus:
-            shell.warning(f'{datafile} 还应当包含以下字段：', '、'.join(surplus))
-            continue
+                data = divisions.load(fp, snapshots, encoding)
+            except ValueError as e:
+                shell.warning(f'文件格式错误。{e}')
+                continue
+            except Exception:
+                shell.stderr.print_exception()
+                continue
 
         shell.contexts['ADC'][fp.stem] = data
         shell.info(('已重新载入' if is_reload else '已载入') + str(fp))
 
 
+def name_index(shell: FoxLoop, filename: str, status: Status | None = None) -> NameIndex:
+    """
+    获取某一份数据集的名称索引。索引在第一次搜索时才建立，并保存在 ``shell.contexts['ADC-NAMES']`` 中，
+    数据集被重新载入后自动重建。
+
+    :param status: 调用方已经显示的状态。建立索引时只临时修改它的文字，不再另外显示一个，以免两个状态争抢终端。
+    """
+    indexes = shell.contexts.setdefault('ADC-NAMES', {})
+    table = shell.contexts['ADC'][filename]['data']
+    index = indexes.get(filename)
+    if index is None or index.table is not table:
+        message = f'正在为 {filename}.json 建立名称索引...'
+        if status is None:
+            with shell.stderr.status(message, spinner='bouncingBar'):
+                index = indexes[filename] = NameIndex(table)
+        else:
+            previous = status.status
+            status.update(message)
+            index = indexes[filename] = NameIndex(table)
+            status.update(previous)
+    return index
+
+
 @manager.command('search', short_help='搜索编码或地名')
 @click.option('-c', '--code', multiple=True, help='搜索区划代码。')
 @click.option('-C', '--code-reg', multiple=True, type=Regex(), help='使用正则表达式搜索区划代码。')
 @click.option('-n', '--name', multiple=True, help='搜索区划名称。')
 @click.option('-N', '--name-reg', multiple=True, type=Regex(), help='使用正则表达式搜索区划名称。')
+@click.option('-z', '--fuzzy', is_flag=True, help='模糊搜索区划名称：-n 的各个字符按顺序出现即可，中间可以间隔其它字符。')
 @click.option('-A/-a', '--all/--any', 'op', default=False, help='串联还是并联所有条件。默认是 -a 并联。')
 @click.option('-f', '--filename', help='将搜索限定在某一份数据集中。')
+@click.option('-l', '--limit', metavar='N', type=click.IntRange(min=1), help='最多输出 N 条结果，找够后立即停止搜索。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
 @click.pass_obj
 def searcher(shell: FoxLoop,
@@ -180,10 +188,15 @@ def searcher(shell: FoxLoop,
              name: tuple[str],
              code_reg: tuple[Pattern[str]],
              name_reg: tuple[Pattern[str]],
+             fuzzy: bool,
              filename: str | None,
-             op: bool):
+             op: bool,
+             limit: int | None):
     """
     当 FILENAME 是纯ASCII时搜索编码，否则搜索地名。
+
+    -n 使用名称的倒排索引查找，不需要逐条比较；其余条件被编译为一个会短路的判断函数逐条比较，
+    但串联（-A）时只需比较 -n 找到的候选。结果按代码排序。
     """
     shell.contexts.setdefault('ADC', {})
     if not any([*code, *code_reg, *name, *name_reg]):
@@ -194,19 +207,35 @@ def searcher(shell: FoxLoop,
     except RuntimeError:
         return
 
-    ope = all if op else any
-
-    with shell.stdout.status('正在搜索...', spinner='bouncingBar'):
+    predicate = compile_predicate(code, code_reg, name_reg, op)
+    remain = limit
+
+    def scan(table: DivisionTable, hits: set[int]) -> Iterator[int]:
+        """
+        按代码的顺序产出匹配的下标：在 -n 的结果中，或者满足其余条件。
+        """
+        if predicate is None:
+            yield from sorted(hits)
+            return
+        for i, (k, v) in enumerate(table.items()):
+            if i in hits or predicate(k, v):
+                yield i
+
+    with shell.stdout.status('正在搜索...', spinner='bouncingBar') as status:
         for f in files:
-            for k, v in shell.contexts['ADC'][f]['data'].items():
-                hits = [
-                    *[c in k for c in code],
-                    *[n in v for n in name],
-                    *[re.match(rc, k) for rc in code_reg],
-                    *[re.match(rn, v) for rn in name_reg],
-                ]
-                if ope(hits):
-                    shell.output(f'{f}.json | {k}\t{v}')
+            table = shell.contexts['ADC'][f]['data']
+            matched = [set(name_index(shell, f, status).search(n, fuzzy)) for n in name]
+            if op and matched:
+                candidates = sorted(set.intersection(*matched))
+                found = (i for i in candidates if predicate is None or predicate(table.key_at(i), table.name_at(i)))
+            else:
+                found = scan(table, set().union(*matched))
+            for i in itertools.islice(found, remain):
+                shell.output(f'{f}.json | {table.key_at(i)}\t{table.name_at(i)}')
+                if remain is not None:
+                    remain -= 1
+            if remain == 0:
+                break
 
 
 @manager.command('parse', short_help='解析一个代码')
@@ -263,3 +292,111 @@ def parser(shell: FoxLoop, code: str, filename: str | None):
             third.add(line)
 
     shell.output(tree)
+
+
+@manager.command('children', short_help='列出直接下级')
+@click.argument('code', default='')
+@click.option('-f', '--filename', help='将搜索限定在某一份数据集中。')
+@click.help_option('-h', '--help', help='列出这份帮助信息。')
+@click.pass_obj
+def children(shell: FoxLoop, code: str, filename: str | None):
+    """
+    列出 CODE 的所有直接下级及其下级数量。不指定 CODE 时列出所有省级区划。
+    """
+    shell.contexts.setdefault('ADC', {})
+    if code and not code.isdigit():
+        shell.warning('代码只应包含纯数字。')
+        return
+    try:
+        files = get_files(shell, filename)
+    except RuntimeError:
+        return
+
+    for file in files:
+        table = shell.contexts['ADC'][file]['data']
+        index = DivisionIndex(table)
+        grid = Table('代码', '名称', '下级数量', box=box.SIMPLE_HEAD, title=f'{file}.json')
+        for i in index.children(code):
+            key = table.key_at(i)
+            grid.add_row(key, table.name_at(i), str(len(index.descendants(key))))
+        shell.output(grid)
+
+
+@manager.command('tree', short_help='以树形列出下级')
+@click.argument('code', default='')
+@click.option('-d', '--depth', type=click.IntRange(min=1), default=2, help='展开多少级，默认是 2 。')
+@click.option('-f', '--filename', help='将搜索限定在某一份数据集中。')
+@click.help_option('-h', '--help', help='列出这份帮助信息。')
+@click.pass_obj
+def treer(shell: FoxLoop, code: str, depth: int, filename: str | None):
+    """
+    以树形列出 CODE 的下级，共展开 DEPTH 级，并在根部列出它的所有上级。不指定 CODE 时从省级开始。
+    """
+    shell.contexts.setdefault('ADC', {})
+    if code and not code.isdigit():
+        shell.warning('代码只应包含纯数字。')
+        return
+    try:
+        files = get_files(shell, filename)
+    except RuntimeError:
+        return
+
+    def label(i: int) -> Text:
+        return Text().join([Text(table.key_at(i), 'magenta3'), Text(' '), Text(table.name_at(i))])
+
+    def grow(node: Tree, parent: str, remain: int):
+        for i in index.children(parent):
+            child = node.add(label(i))
+            if remain > 1:
+                grow(child, table.key_at(i), remain - 1)
+
+    for file in files:
+        table = shell.contexts['ADC'][file]['data']
+        index = DivisionIndex(table)
+        tree = Tree(Text(f'{file}.json', 'dim'))
+        node = tree
+        for i in index.ancestors(code):
+            node = node.add(label(i))
+        if code and (i := table.index(index.normalize(code))) >= 0:
+            node = node.add(label(i))
+        grow(node, code, depth)
+        shell.output(tree)
+
+
+@manager.command('diff', short_help='比较两份数据集')
+@click.argument('old')
+@click.argument('new')
+@click.option('-k', '--kind', multiple=True, type=click.Choice(list(divisions.CHANGES)),
+              help='只列出某些种类的变化，可以重复指定。')
+@click.option('-L', '--level', multiple=True, type=click.IntRange(1, 5), help='只列出某些层级（1 到 5）的变化，可以重复指定。')
+@click.option('-s', '--summary', is_flag=True, help='只列出按种类和层级的统计。')
+@click.help_option('-h', '--help', help='列出这份帮助信息。')
+@click.pass_obj
+def differ(shell: FoxLoop, old: str, new: str, kind: tuple[str], level: tuple[int], summary: bool):
+    """
+    比较两份已载入的数据集 OLD 与 NEW（文件名不含 .json），逐条列出更名、迁移、改码、撤销、新增、拆分与合并，
+    最后按种类和层级统计。两份数据集的代码都是有序的，所以只需同时遍历一次。
+    """
+    shell.contexts.setdefault('ADC', {})
+    try:
+        get_files(shell, old)
+        get_files(shell, new)
+    except RuntimeError:
+        return
+
+    counts = Counter()
+    for change in divisions.diff(shell.contexts['ADC'][old]['data'], shell.contexts['ADC'][new]['data']):
+        if kind and change.kind not in kind or level and change.level not in level:
+            continue
+        counts[change.kind, change.level] += 1
+        if not summary:
+            before = f'{change.old} {change.old_name}' if change.old else ''
+            after = f'{change.new} {change.new_name}' if change.new else ''
+            shell.output(f'{divisions.CHANGES[change.kind]}\t{before}\t->\t{after}', markup=False)
+
+    grid = Table('变化', *(f'{n}级' for n in '省地县乡村'), '合计', box=box.SIMPLE_HEAD, title=f'{old}.json -> {new}.json')
+    for key, label in divisions.CHANGES.items():
+        row = [counts[key, n] for n in range(1, 6)]
+        if any(row):
+            grid.add_row(label, *map(str, row), str(sum(row)))
+    shell.output(grid)
@@ -1,11 +1,41 @@
 #!./venv/Scripts/python.exe
 # -*- coding: UTF-8 -*-
-from base64 import b64encode, b85encode, b32encode
-from random import randbytes
+from functools import partial
+from random import Random
 
 import click
 
+from core.codecs import BASES, CODECS, lookup
 from core.console import HydroConsole
+from core.generators import check_keyspace, cpu_workers, deduplicate, emit, generate
+from core.streams import BLOCK
+
+
+def to_integer(data: bytes) -> bytes:
+    return str(int.from_bytes(data, 'big', signed=True)).encode('ASCII')
+
+
+def to_array(data: bytes) -> bytes:
+    return ','.join(map(str, data)).encode('ASCII')
+
+
+FORMATS = {
+    'integer': to_integer,
+    'array': to_array,
+}  # 注册表中的编码方式以外的输出格式
+
+
+def produce(rng: Random, count: int, length: int, fmt: str) -> bytes:
+    """
+    生成 count 行、每行 LENGTH 字节的数据，按 fmt 编码后以换行符连接。
+    """
+    block = rng.randbytes(length * count)
+    encode = FORMATS[fmt] if fmt in FORMATS else CODECS[fmt].encode
+    return b'\n'.join(encode(block[i:i + length]) for i in range(0, len(block), length)) + b'\n'
+
+
+def produce_raw(rng: Random, count: int, length: int) -> bytes:
+    return rng.randbytes(length * count)
 
 
 @click.command(__name__, short_help='随机生成 LENGTH 字节二进制数据', no_args_is_help=True)
@@ -13,46 +43,74 @@ from core.console import HydroConsole
 @click.option('--base64', is_flag=True, help='输出base64编码结果。')
 @click.option('--base85', is_flag=True, help='输出base85编码结果。')
 @click.option('--base32', is_flag=True, help='输出base32编码结果。')
-@click.option('-b', metavar='BASE', type=int, help='输出base64/85/32编码结果。')
+@click.option('-b', metavar='BASE', type=int, help=f'输出 Base{"/".join(map(str, BASES))} 编码结果。')
+@click.option('-f', '--format', 'fmt', type=click.Choice(list(CODECS)), help='使用注册表中的任意一种编码方式。')
 @click.option('-i', '--integer', is_flag=True, help='输出一个十进制有符号整数。')
 @click.option('-a', '--array', is_flag=True, help='以十进制无符号整数数组形式输出。')
 @click.option('-o', '--once', is_flag=True, help='一次性输出所有，而不是一行行输出。')
 @click.option('-q', '--qty', metavar='LINES', type=int, default=1, help='生成多少行。')
+@click.option('-O', '--output', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='以数据块的形式流式写入文件，- 表示标准输出。完成后输出吞吐量。')
+@click.option('-r', '--raw', is_flag=True, help='直接输出 LENGTH×LINES 字节的原始二进制数据，不编码也不换行。')
+@click.option('-w', '--workers', metavar='N', type=int, default=1, help='使用多少个进程生成，0 表示CPU核心数。默认是 1 。')
+@click.option('--seed', type=int, help='主种子。指定后无论使用多少个进程，输出都可以复现。')
+@click.option('--secure', is_flag=True, help='使用基于 os.urandom 的密码学安全随机数，不能与 --seed 同时使用。')
+@click.option('--unique', is_flag=True, help='保证输出的每一行都互不相同。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
 def generator(
-        length, base64, base85, base32, b, integer, array, once, qty,
+        length, base64, base85, base32, b, fmt, integer, array, once, qty, output, raw, workers, seed, secure, unique,
 ):
     """
     随机生成 LENGTH 个字节的二进制数据，并以某种格式输出为文本。默认输出HEX。
+
+    生成大量数据（例如测试用的大文件）时，使用 -O 或 -r 以数据块的形式写入，而不是一行行打印。
     """
     console = HydroConsole(stderr=True)
 
     if length < 1:
         console.warning('LENGTH 必须是一个正整数。')
         exit(-1)
-    if b not in (None, 64, 85, 32):
-        console.warning('选项 -b 只有以下几种参数：-b64、-b85、-b32')
+    if secure and seed is not None:
+        console.warning('选项 --secure 不能与 --seed 同时使用。')
+        exit(-1)
+    if unique and raw:
+        console.warning('选项 --unique 不能与 --raw 同时使用。')
         exit(-1)
 
-    dataset = (randbytes(length) for _ in range(qty))
     if integer:
-        dataset = (int.from_bytes(d, 'big', signed=True) for d in dataset)
+        fmt = 'integer'
     elif array:
-        dataset = (','.join(map(str, d)) for d in dataset)
-    elif base64 or b == 64:
-        dataset = (b64encode(d).decode('ASCII') for d in dataset)
-    elif base85 or b == 85:
-        dataset = (b85encode(d).decode('ASCII') for d in dataset)
-    elif base32 or b == 32:
-        dataset = (b32encode(d).decode('ASCII') for d in dataset)
-    else:
-        dataset = (d.hex() for d in dataset)
+        fmt = 'array'
+    elif fmt is None:
+        try:
+            fmt = lookup(base=64 if base64 else 85 if base85 else 32 if base32 else b or 16).name
+        except ValueError as e:
+            console.warning(str(e))
+            exit(-1)
+
+    if unique:
+        try:
+            message = check_keyspace(qty, 256 ** length)
+        except ValueError as e:
+            console.warning(str(e))
+            exit(-1)
+        if message:
+            console.warning(message)
 
-    if once:
-        print('\n'.join(dataset))
+    chunk = max(1, BLOCK // length)  # 每个数据块包含多少行
+    if raw:
+        task = partial(produce_raw, length=length)
+        output = output or '-'
     else:
-        for d in dataset:
-            print(d)
+        task = partial(produce, length=length, fmt=fmt)
+    if unique:
+        blocks = deduplicate(generate(task, None, chunk, cpu_workers(workers), seed, secure), qty)
+    else:
+        blocks = generate(task, qty, chunk, cpu_workers(workers), seed, secure)
+
+    meter = emit(blocks, output, once)
+    if meter and output != '-':  # 写入标准输出时只输出数据本身
+        console.print('已写入', meter.report())
 
 
 if __name__ == '__main__':
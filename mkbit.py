@@ -1,12 +1,44 @@
 #!./venv/Scripts/python.exe
 # -*- coding: UTF-8 -*-
-from base64 import b64encode, b85encode, b32encode
+from functools import partial
 from math import ceil
-from random import getrandbits
+from random import Random
 
 import click
 
+from core.codecs import BASES, CODECS, lookup
 from core.console import HydroConsole
+from core.generators import cpu_workers, emit, generate
+from core.streams import BLOCK
+
+
+def to_array(data: bytes) -> bytes:
+    return ','.join(map(str, data)).encode('ASCII')
+
+
+FORMATS = {
+    'array': to_array,
+}  # 注册表中的编码方式以外的输出格式
+
+
+def produce(rng: Random, count: int, bits: int, fmt: str) -> bytes:
+    """
+    生成 count 行、每行 BITS 比特的数据，按 fmt 编码后以换行符连接。
+
+    整个数据块的随机字节一次性生成，每行取 ceil(BITS/8) 个字节并舍弃多余的低位。
+    """
+    byteqty = ceil(bits / 8)
+    shift = byteqty * 8 - bits
+    block = rng.randbytes(byteqty * count)
+    chunks = (block[i:i + byteqty] for i in range(0, len(block), byteqty))
+    if fmt == 'integer':
+        rows = (str(int.from_bytes(c, 'big') >> shift).encode('ASCII') for c in chunks)
+    else:
+        encode = FORMATS[fmt] if fmt in FORMATS else CODECS[fmt].encode
+        if shift:
+            chunks = ((int.from_bytes(c, 'big') >> shift).to_bytes(byteqty, 'big') for c in chunks)
+        rows = map(encode, chunks)
+    return b'\n'.join(rows) + b'\n'
 
 
 @click.command(__name__, short_help='随机生成 BITS 比特二进制数据', no_args_is_help=True)
@@ -14,14 +46,20 @@ from core.console import HydroConsole
 @click.option('--base64', is_flag=True, help='输出base64编码结果。')
 @click.option('--base85', is_flag=True, help='输出base85编码结果。')
 @click.option('--base32', is_flag=True, help='输出base32编码结果。')
-@click.option('-b', metavar='BASE', type=int, help='输出base64/85/32编码结果。')
+@click.option('-b', metavar='BASE', type=int, help=f'输出 Base{"/".join(map(str, BASES))} 编码结果。')
+@click.option('-f', '--format', 'fmt', type=click.Choice(list(CODECS)), help='使用注册表中的任意一种编码方式。')
 @click.option('-i', '--integer', is_flag=True, help='输出一个十进制有符号整数。')
 @click.option('-a', '--array', is_flag=True, help='以十进制无符号整数数组形式输出。')
 @click.option('-o', '--once', is_flag=True, help='一次性输出所有，而不是一行行输出。')
 @click.option('-q', '--qty', metavar='LINES', type=int, default=1, help='生成多少行。')
+@click.option('-O', '--output', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='以数据块的形式流式写入文件，- 表示标准输出。完成后输出吞吐量。')
+@click.option('-w', '--workers', metavar='N', type=int, default=1, help='使用多少个进程生成，0 表示CPU核心数。默认是 1 。')
+@click.option('--seed', type=int, help='主种子。指定后无论使用多少个进程，输出都可以复现。')
+@click.option('--secure', is_flag=True, help='使用基于 os.urandom 的密码学安全随机数，不能与 --seed 同时使用。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
 def generator(
-        bits, base64, base85, base32, b, integer, array, once, qty,
+        bits, base64, base85, base32, b, fmt, integer, array, once, qty, output, workers, seed, secure,
 ):
     """
     随机生成 BITS 比特的二进制数据，并以某种格式输出为文本。默认输出HEX。
@@ -31,31 +69,28 @@ def generator(
     if bits < 1:
         console.warning('BITS 必须是一个正整数')
         exit(-1)
-    if b not in (None, 64, 85, 32):
-        console.warning('选项 -b 只有以下几种参数：-b64、-b85、-b32')
+    if secure and seed is not None:
+        console.warning('选项 --secure 不能与 --seed 同时使用。')
         exit(-1)
 
-    byteqty = ceil(bits / 8)
-    dataset = (getrandbits(bits) for _ in range(qty))
-    byteset = (d.to_bytes(byteqty, 'big') for d in dataset)
     if integer:
-        dataset = map(str, dataset)
+        fmt = 'integer'
     elif array:
-        dataset = (','.join(map(str, d)) for d in byteset)
-    elif base64 or b == 64:
-        dataset = (b64encode(d).decode('ASCII') for d in byteset)
-    elif base85 or b == 85:
-        dataset = (b85encode(d).decode('ASCII') for d in byteset)
-    elif base32 or b == 32:
-        dataset = (b32encode(d).decode('ASCII') for d in byteset)
-    else:
-        dataset = (d.hex() for d in byteset)
+        fmt = 'array'
+    elif fmt is None:
+        try:
+            fmt = lookup(base=64 if base64 else 85 if base85 else 32 if base32 else b or 16).name
+        except ValueError as e:
+            console.warning(str(e))
+            exit(-1)
 
-    if once:
-        print('\n'.join(dataset))
-    else:
-        for d in dataset:
-            print(d)
+    chunk = max(1, BLOCK // ceil(bits / 8))  # 每个数据块包含多少行
+    task = partial(produce, bits=bits, fmt=fmt)
+    blocks = generate(task, qty, chunk, cpu_workers(workers), seed, secure)
+
+    meter = emit(blocks, output, once)
+    if meter and output != '-':  # 写入标准输出时只输出数据本身
+        console.print('已写入', meter.report())
 
 
 if __name__ == '__main__':
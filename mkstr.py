@@ -1,10 +1,14 @@
 #!./venv/Scripts/python.exe
 # -*- coding: UTF-8 -*-
-from random import choices
+from functools import partial
+from random import Random
 
 import click
 
+from core.alphabet import alphabet
 from core.console import HydroConsole
+from core.generators import check_keyspace, cpu_workers, deduplicate, emit, generate
+from core.streams import BLOCK
 
 try:
     from configs import charsets
@@ -15,6 +19,13 @@ except ImportError:
     exit(-1)
 
 
+def produce(rng: Random, count: int, length: int, chars: str) -> bytes:
+    """
+    生成 count 行、每行 LENGTH 个字符的字符串，以换行符连接并以 UTF-8 编码。
+    """
+    return alphabet(chars).lines(rng, count, length)
+
+
 @click.command(__name__, short_help='随机生成 LENGTH 个字符', no_args_is_help=True)
 @click.argument('length', type=int)
 @click.option('-d', '--digit', is_flag=True, help='向字符集加入阿拉伯数字。')
@@ -29,8 +40,23 @@ except ImportError:
 @click.option('-c', '--charset', 'names', metavar='NAME', multiple=True, help='向字符集添加预设的字符集。可多选。')
 @click.option('-o', '--once', is_flag=True, help='一次性输出所有，而不是一行行输出。')
 @click.option('-q', '--qty', metavar='LINES', type=int, default=1, help='生成多少行。')
+@click.option('-O', '--output', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='以数据块的形式流式写入文件，- 表示标准输出。完成后输出吞吐量。')
+@click.option('-w', '--workers', metavar='N', type=int, default=1, help='使用多少个进程生成，0 表示CPU核心数。默认是 1 。')
+@click.option('--seed', type=int, help='主种子。指定后无论使用多少个进程，输出都可以复现。')
+@click.option('--secure', is_flag=True, help='使用基于 os.urandom 的密码学安全随机数，不能与 --seed 同时使用。')
+@click.option('--unique', is_flag=True, help='保证输出的每一行都互不相同。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
-def generator(length: int, names: tuple[str], once: bool, qty: int, **csn: bool):
+def generator(length: int,
+              names: tuple[str],
+              once: bool,
+              qty: int,
+              output: str | None,
+              workers: int,
+              seed: int | None,
+              secure: bool,
+              unique: bool,
+              **csn: bool):
     """
     随机生成 LENGTH 个字符。
 
@@ -46,13 +72,29 @@ def generator(length: int, names: tuple[str], once: bool, qty: int, **csn: bool)
     if not chars:
         console.warning('字符集空空如也。请使用 -c 参数指定一些字符集。')
         exit(-1)
+    if secure and seed is not None:
+        console.warning('选项 --secure 不能与 --seed 同时使用。')
+        exit(-1)
+
+    if unique:
+        try:
+            message = check_keyspace(qty, len(set(chars)) ** length)
+        except ValueError as e:
+            console.warning(str(e))
+            exit(-1)
+        if message:
+            console.warning(message)
 
-    dataset = (''.join(choices(chars, k=length)) for _ in range(qty))
-    if once:
-        print('\n'.join(dataset))
+    chunk = max(1, BLOCK // (length + 1))  # 每个数据块包含多少行
+    task = partial(produce, length=length, chars=chars)
+    if unique:
+        blocks = deduplicate(generate(task, None, chunk, cpu_workers(workers), seed, secure), qty)
     else:
-        for d in dataset:
-            print(d)
+        blocks = generate(task, qty, chunk, cpu_workers(workers), seed, secure)
+
+    meter = emit(blocks, output, once)
+    if meter and output != '-':  # 写入标准输出时只输出数据本身
+        console.print('已写入', meter.report())
 
 
 if __name__ == '__main__':
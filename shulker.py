@@ -1,18 +1,17 @@
 #!./venv/Scripts/python.exe
 # -*- coding: UTF-8 -*-
+import importlib.util
 import sys
 
 try:
-    import importlib.util
     from pathlib import Path
-    from typing import Iterable, Generator, Any
+    from typing import Iterable
 
     import click
-    from rich import box
-    from rich.panel import Panel
-    from rich.style import Style
-    from rich.table import Table, Column
-    from rich.text import Text
+
+    # rich 只在真正需要时才导入（见 HydroConsole），这里只检查它是否已安装
+    if importlib.util.find_spec('rich') is None:
+        raise ImportError("No module named 'rich'")
 except ImportError as exc_info:
     raise ImportError(
         'YOU ARE USING THIS PYTHON:\n' + str(sys.executable)
@@ -20,9 +19,23 @@ except ImportError as exc_info:
 
 from core import version
 from core.console import HydroConsole
+from core.groups import LazyGroup
+from core.indexer import CommandIndex
 
 ego: Path = Path(__file__).absolute()  # 当前文件
 root: Path = ego.parent  # 项目根目录
+indexfile: Path = root / '__pycache__' / 'shulker-index.json'  # 指令元数据索引
+
+# 可以通过 shulker 直接调用的子指令，格式为 “指令名 -> 模块:符号” ，调用时才会导入对应的模块
+subcommands: dict[str, str] = {
+    'char': 'char:character',
+    'edit': 'edit:opener',
+    'mkbin': 'mkbin:generator',
+    'mkbit': 'mkbit:generator',
+    'mkstr': 'mkstr:generator',
+    'url': 'url:operator',
+    'wp': 'wp:converter',
+}
 
 
 def get_sources() -> Iterable:
@@ -65,7 +78,14 @@ def set_shebang(src: Path, interpreter: str) -> str:
         return str(e)
 
 
-@click.group(__name__, short_help='指令管理')
+def command_meta() -> dict[str, dict]:
+    """
+    指令索引中缓存的元数据，供 --help 列出子指令时使用，不导入任何脚本。
+    """
+    return CommandIndex(indexfile).load().by_name()
+
+
+@click.group(__name__, cls=LazyGroup, lazy_commands=subcommands, lazy_meta=command_meta, short_help='指令管理')
 @click.version_option(version, '-v', '--version', prog_name='shulker', help='显示版本信息。')
 @click.help_option('-h', '--help', help='显示此帮助信息。')
 def cli():
@@ -77,56 +97,60 @@ def cli():
 
 @cli.command('list', short_help='列出项目下所有脚本提供的指令')
 @click.option('-a', '--all', 'fully', is_flag=True, help='显示所有指令，包括隐藏的。')
+@click.option('-r', '--rebuild', is_flag=True, help='忽略索引，重新扫描所有脚本。')
+@click.option('-j', '--jobs', type=int, default=0, help='同时在多少个子进程中隔离扫描脚本，每个脚本一个全新的进程。默认是 0 ，即在当前进程中扫描。')
+@click.option('-t', '--timeout', type=float, default=10, help='隔离扫描时每个脚本的超时秒数，默认是 10 。')
+@click.option('-p', '--profile', is_flag=True, help='在全新的子进程中重新扫描所有脚本，并列出每个脚本独自的导入耗时。')
 @click.help_option('-h', '--help', help='显示此帮助信息。')
-def scanner(fully):
+def scanner(fully, rebuild, jobs, timeout, profile):
     """
-    扫描根目录下不在子目录中的所有python脚本，动态导入后执行以获取所有指令。
+    扫描根目录下不在子目录中的所有python脚本，获取所有指令。
 
-    当存在基于 click.Group 的类时只获取它，否则获取所有基于 click.Command 的类。
+    指令的元数据会缓存在索引中，只有发生变化的脚本才会被动态导入并执行。
     """
+    from rich import box
+    from rich.table import Table, Column
+    from rich.text import Text
 
-    def enum_commands() -> Generator[click.Command, None, None]:
-        """
-        枚举变量 "module" 中出现的所有继承 click.Command 的符号。
-        """
-        for v in module.__dict__.values():
-            if isinstance(v, click.Command):
-                # 命令名默认是被装饰的函数名，这里改成文件名做到调用与声明一致
-                v.name = str(v.name).replace('.py', '', 1)
-                yield v
-
-    commands = []
-    for src in get_sources():
-        # 根据绝对路径导入源码并运行
-        # 相当于 from (src.parent) import (src) as module
-        spec = importlib.util.spec_from_file_location(src.name, src)
-        module = importlib.util.module_from_spec(spec)
-        sys.modules[src.name] = module
-        spec.loader.exec_module(module)
-
-        # 获取源码中 click.Command 的所有子类，
-        # 然后过滤出 click.Group 的子类，
-        # 最后，如果有后者就选择后者，否则选择前者。
-        # 因为如果使用了 click.Group ，
-        # click是不会再将 click.Command 显示出来的。
-        cmds = list(enum_commands())
-        groups = [v for v in cmds if isinstance(v, click.Group)]
-        commands.extend(groups if groups else cmds)
+    console = HydroConsole()
+    monitor = HydroConsole(stderr=True)
+
+    # 在当前进程中扫描时，后面的脚本不必再导入前面已经导入过的模块，耗时没有可比性
+    if profile:
+        jobs = max(jobs, 1)
+
+    index = CommandIndex(indexfile)
+    if not rebuild:
+        index.load()
+    commands = index.update(get_sources(), jobs=jobs, timeout=timeout, force=profile)
+
+    for report in index.reports:
+        if report.error:
+            monitor.warning(f'扫描 {report.src.name} 失败：{report.error}')
 
     # table = Table('指令', '说明', box=box.SIMPLE_HEAD, row_styles=["dim", ""])
     table = Table('指令', '说明', box=box.SIMPLE_HEAD)
-    for cmd in commands if fully else (c for c in commands if not c.hidden):
+    for cmd in commands if fully else (c for c in commands if not c['hidden']):
         table.add_row(
-            Text(cmd.name, 'yellow' if cmd.deprecated else 'magenta' if cmd.hidden else ''),
-            cmd.short_help
+            Text(cmd['name'], 'yellow' if cmd['deprecated'] else 'magenta' if cmd['hidden'] else ''),
+            cmd['short_help']
         )
 
-    console = HydroConsole()
     if table.row_count > 0:
         console.print(table)
     else:
         console.warning('未找到任何命令。')
 
+    if profile:
+        timing = Table('脚本', Column('导入耗时', justify='right'), '状态', box=box.SIMPLE_HEAD)
+        for report in sorted(index.reports, key=lambda r: -1 if r.elapsed is None else r.elapsed, reverse=True):
+            timing.add_row(
+                report.src.name,
+                '-' if report.elapsed is None else f'{report.elapsed * 1000:.1f} ms',
+                Text(report.error or '成功', 'red' if report.error else 'green'),
+            )
+        console.print(timing)
+
 
 @cli.command('migrate', short_help='迁移到Linux／MacOS')
 @click.help_option('-h', '--help', help='显示此帮助信息。')
@@ -134,6 +158,11 @@ def migrator():
     """
     迁移到Linux／MacOS，一次性搞定：自定义shebang，添加执行权限，创建符号链接。
     """
+    from rich import box
+    from rich.style import Style
+    from rich.table import Table
+    from rich.text import Text
+
     table = Table('文件', 'Shebang', box=box.SIMPLE_HEAD)
     for src in get_sources():
         src: Path
@@ -196,6 +225,8 @@ def migrator():
 @cli.command('unlink', short_help='删除项目根目录下所有符号链接')
 @click.help_option('-h', '--help', help='显示此帮助信息。')
 def unlinker():
+    from rich.text import Text
+
     console = HydroConsole()
     symlinks = (lnk for lnk in root.glob('*') if lnk.is_symlink() and lnk.is_file())
 
@@ -221,6 +252,8 @@ def fixer():
     """
     import winreg
 
+    from rich.text import Text
+
     console = HydroConsole(no_color=True)
     monitor = HydroConsole(stderr=True)
     p1 = Path(r'C:\Windows\py.exe')
@@ -281,6 +314,9 @@ def fixer():
 @cli.command('ref', short_help='列出参考信息')
 @click.help_option('-h', '--help', help='显示此帮助信息。')
 def explorer():
+    from rich.panel import Panel
+    from rich.table import Table, Column
+
     console = HydroConsole()
 
     # noinspection SpellCheckingInspection
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 脚本与 core 包都在项目根目录下
+sys.path.insert(0, str(Path(__file__).absolute().parent.parent))
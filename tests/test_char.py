@@ -0,0 +1,30 @@
+import pytest
+from click.testing import CliRunner
+
+pytest.importorskip('configs')
+
+import char  # noqa: E402
+
+
+def invoke(args: list[str], stdin: str | None = None) -> str:
+    result = CliRunner(mix_stderr=False).invoke(char.character, args, input=stdin)
+    assert result.exit_code == 0, result.output + result.stderr
+    return result.output
+
+
+@pytest.mark.parametrize('encoding', ['utf-16', 'GBK', 'UTF-8'])
+def test_encode_output_round_trip(tmp_path, encoding):
+    text = '中文 ABC'
+    path = tmp_path / 'encoded.txt'
+    invoke(['encode', '-X', '-e', encoding, '-O', str(path)], text + '\n')
+    encoded = path.read_bytes()
+    assert encoded == text.encode(encoding).hex().upper().encode('ASCII') + b'\n'
+    assert invoke(['decode', '-X', '-e', encoding], encoded.decode('ASCII')).endswith(text + '\n')
+
+
+def test_auto_decode_counts_only_valid_lines():
+    result = CliRunner(mix_stderr=False).invoke(char.character, ['decode', '-l', '-a'], input='zz!!\naGk=\n')
+    assert result.exit_code == 0
+    assert result.stdout == '\nhi\n'
+    assert 'base85' not in result.stderr
+    assert '识别为 base64 1 行' in result.stderr
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from core.codecs import CODECS, measure_input, parallel
+
+
+@pytest.mark.parametrize('name', ['base64', 'base64url'])
+def test_base64_rejects_foreign_bytes(name):
+    codec = CODECS[name]
+    assert codec.decode(codec.encode(b'hello world') + b'\n') == b'hello world'
+    with pytest.raises(ValueError):
+        codec.decode(b'aGVs!bG8=')
+
+
+@pytest.mark.parametrize('name', ['hex', 'base64', 'base32', 'base85'])
+def test_parallel_round_trip(tmp_path, name):
+    codec = CODECS[name]
+    data = os.urandom(100_003)
+    (tmp_path / 'raw').write_bytes(data)
+    raw, encoded, decoded = (str(tmp_path / n) for n in ('raw', 'encoded', 'decoded'))
+    parallel(codec, raw, encoded, 2, False, measure_input(codec, raw, False))
+    parallel(codec, encoded, decoded, 2, True, measure_input(codec, encoded, True))
+    assert (tmp_path / 'decoded').read_bytes() == data
+
+
+def test_parallel_failure_leaves_no_output(tmp_path):
+    codec = CODECS['base64']
+    source = tmp_path / 'encoded'
+    source.write_bytes(codec.encode(os.urandom(3000))[:-8] + b'!!!!AAAA')
+    with pytest.raises(ValueError):
+        parallel(codec, str(source), str(tmp_path / 'decoded'), 2, True, measure_input(codec, str(source), True))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['encoded']
@@ -0,0 +1,151 @@
+import random
+
+import pytest
+
+from core.divisions import DivisionCode, DivisionIndex, DivisionTable, compile_snapshot
+
+
+def table_of(data: dict[str, str]) -> DivisionTable:
+    return DivisionTable(compile_snapshot({}, data, (0, 0)), {})
+
+
+def is_ancestor(upper: str, lower: str) -> bool:
+    adc = DivisionCode.fromcode(upper)
+    return upper != lower and lower.startswith(adc.prefix(adc.level))
+
+
+def brute_descendants(table: DivisionTable, code: str) -> list[int]:
+    code = code.ljust(12, '0')
+    return [i for i, k in enumerate(table) if is_ancestor(code, k)]
+
+
+def brute_children(table: DivisionTable, code: str) -> list[int]:
+    below = brute_descendants(table, code)
+    keys = [table.key_at(i) for i in below]
+    return [i for i, k in zip(below, keys) if not any(is_ancestor(u, k) for u in keys)]
+
+
+def brute_ancestors(table: DivisionTable, code: str) -> list[int]:
+    code = code.ljust(12, '0')
+    return [i for i, k in enumerate(table) if is_ancestor(k, code) and DivisionCode.fromcode(k).level]
+
+
+def random_table(seed: int) -> DivisionTable:
+    rng = random.Random(seed)
+    data = {}
+    for _ in range(300):
+        adc = DivisionCode(f'{rng.randint(11, 13)}', f'{rng.randint(0, 3):02}', f'{rng.randint(0, 3):02}',
+                           f'{rng.randint(0, 3):03}', f'{rng.randint(0, 3):03}')
+        level = rng.randint(1, 5)
+        data[adc.code(level)] = f'区划{len(data)}'
+    # 随机删掉一些上级，制造缺失的层级
+    for key in rng.sample(sorted(data), len(data) // 3):
+        del data[key]
+    return table_of(data)
+
+
+def test_children_with_missing_level():
+    table = table_of({'110101000000': '甲', '110102000000': '乙', '110201000000': '丙'})
+    index = DivisionIndex(table)
+    assert [table.key_at(i) for i in index.children('11')] == ['110101000000', '110102000000', '110201000000']
+    assert len(index.descendants('11')) == 3
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_index_matches_brute_force(seed):
+    table = random_table(seed)
+    index = DivisionIndex(table)
+    codes = {''} | {table.key_at(i) for i in range(len(table))}
+    codes |= {DivisionCode.fromcode(c).code(n) for c in list(codes) if c for n in range(1, 5)}
+    for code in sorted(codes):
+        assert list(index.descendants(code)) == brute_descendants(table, code), code
+        assert index.children(code) == brute_children(table, code), code
+        assert index.ancestors(code) == brute_ancestors(table, code), code
+
+
+def test_predicate_keeps_backreferences():
+    import re
+
+    from core.divisions import compile_predicate
+
+    for every in (False, True):
+        predicate = compile_predicate((), (re.compile(r'(1)\1'),), (), every)
+        assert predicate('110000000000', '')
+    predicate = compile_predicate((), (re.compile(r'(2)\1'), re.compile(r'(1)\1')), (), False)
+    assert predicate('110000000000', '')
+    assert not predicate('120000000000', '')
+    predicate = compile_predicate(('99', '01'), (), (re.compile('东'), re.compile('西')), False)
+    assert predicate('110101000000', '')
+    assert predicate('120000000000', '西城')
+    assert not predicate('120000000000', '城西')
+
+
+def changes(old: dict[str, str], new: dict[str, str]) -> list[tuple[str, str, str]]:
+    from core.divisions import diff
+
+    return [(c.kind, c.old, c.new) for c in diff(table_of(old), table_of(new))]
+
+
+BASE = {
+    '110000000000': '北京',
+    '110100000000': '甲市',
+    '110101000000': '一县',
+    '110101001000': '东镇',
+    '110101002000': '西镇',
+    '110200000000': '乙市',
+    '110201000000': '二县',
+    '110300000000': '丙市',
+    '110301000000': '三县',
+}
+
+
+def test_diff_unchanged():
+    assert changes(BASE, BASE) == []
+
+
+def test_diff_rename():
+    assert changes(BASE, BASE | {'110201000000': '新二县'}) == [('renamed', '110201000000', '110201000000')]
+
+
+def test_diff_move_with_followers():
+    new = {k: v for k, v in BASE.items() if not k.startswith('110101')}
+    new |= {'110202000000': '一县', '110202001000': '东镇', '110202002000': '西镇'}
+    assert changes(BASE, new) == [('moved', '110101000000', '110202000000')]
+
+
+def test_diff_split():
+    # 一县整体迁到乙市，但西镇分到了丙市的三县
+    new = {k: v for k, v in BASE.items() if not k.startswith('110101')}
+    new |= {'110202000000': '一县', '110202001000': '东镇', '110301003000': '西镇'}
+    assert changes(BASE, new) == [
+        ('moved', '110101000000', '110202000000'),
+        ('moved', '110101002000', '110301003000'),
+        ('split', '110101000000', '110202000000,110301000000'),
+    ]
+
+
+def test_diff_merge():
+    # 撤销甲市，一县并入乙市
+    new = {k: v for k, v in BASE.items() if not k.startswith('1101')}
+    new |= {'110202000000': '一县', '110202001000': '东镇', '110202002000': '西镇'}
+    assert changes(BASE, new) == [
+        ('moved', '110101000000', '110202000000'),
+        ('removed', '110100000000', ''),
+        ('merged', '110100000000,110200000000', '110200000000'),
+    ]
+
+
+def test_diff_added_and_removed():
+    new = {k: v for k, v in BASE.items() if k != '110301000000'} | {'110302000000': '四县'}
+    assert changes(BASE, new) == [('removed', '110301000000', ''), ('added', '', '110302000000')]
+
+
+def test_diff_split_off_new_area():
+    # 从一县分设五县，西镇划入五县
+    new = {k: v for k, v in BASE.items() if k != '110101002000'}
+    new |= {'110105000000': '五县', '110105002000': '西镇'}
+    assert changes(BASE, new) == [
+        ('moved', '110101002000', '110105002000'),
+        ('added', '', '110105000000'),
+        ('split', '110101000000', '110101000000,110105000000'),
+    ]
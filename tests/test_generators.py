@@ -0,0 +1,46 @@
+import pytest
+from click.testing import CliRunner
+
+from core.generators import Fingerprints, deduplicate
+
+
+def test_deduplicate_stops_before_filling_fingerprints():
+    # 每块的行数远多于 qty ，凑够之后的行不应再加入指纹集合
+    blocks = (b''.join(b'%08d\n' % (i * 10000 + j) for j in range(10000)) for i in range(3))
+    rows = b''.join(deduplicate(blocks, 10)).splitlines()
+    assert rows == [b'%08d' % j for j in range(10)]
+
+
+def test_deduplicate_skips_duplicates():
+    blocks = iter([b'a\nb\na\n', b'b\nc\nd\n'])
+    assert b''.join(deduplicate(blocks, 3)) == b'a\nb\nc\n'
+
+
+def test_fingerprints_raise_when_full():
+    seen = Fingerprints(1)
+    for i in range(len(seen.table) - 1):
+        assert seen.add(b'%d' % i)
+    with pytest.raises(OverflowError):
+        seen.add(b'full')
+
+
+def run(command, *args: str) -> list[str]:
+    result = CliRunner().invoke(command, args)
+    assert result.exit_code == 0, result.output
+    return result.output.splitlines()
+
+
+def test_mkbin_unique_with_small_quantity():
+    import mkbin
+
+    for qty in (10, 20000):
+        lines = run(mkbin.generator, '4', '-q', str(qty), '--unique')
+        assert len(lines) == len(set(lines)) == qty
+
+
+def test_mkstr_unique_with_small_quantity():
+    pytest.importorskip('configs')
+    import mkstr
+
+    lines = run(mkstr.generator, '8', '-U', '-D', '-q', '10', '--unique')
+    assert len(lines) == len(set(lines)) == 10
@@ -0,0 +1,34 @@
+import json
+
+from click.testing import CliRunner
+
+import url
+
+
+def invoke(args: list[str], stdin: str | bytes) -> CliRunner:
+    result = CliRunner(mix_stderr=False).invoke(url.operator, args, input=stdin)
+    assert result.exit_code == 0, result.output + result.stderr
+    return result
+
+
+def test_decode_lines_reports_invalid_utf8():
+    result = invoke(['decode', '-l'], 'a%20b\n%FF\n%E4%B8%AD\n')
+    assert result.stdout_bytes == 'a b\n\n中\n'.encode('UTF-8')
+    assert '第 2 行' in result.stderr
+
+
+def test_encode_decode_lines_round_trip():
+    text = 'a b/中?x=1&y=2\n\n#\n'
+    encoded = invoke(['encode', '-l'], text).stdout_bytes
+    assert invoke(['decode', '-l'], encoded).stdout_bytes == text.encode('UTF-8')
+
+
+def test_parse_jsonl_keeps_repeated_params():
+    result = invoke(['parse', '-i', '-'], 'http://h/p?x=1&y=2&y=3\n')
+    assert json.loads(result.stdout)['query'] == {'x': ['1'], 'y': ['2', '3']}
+
+
+def test_parse_aggregate_jsonl_escapes_keys():
+    result = invoke(['parse', '-i', '-', '-a'], 'http://h/a"b\\\\c?k=1\n')
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert {'kind': 'path', 'key': '/a"b\\\\c', 'count': 1} in records
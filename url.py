@@ -1,14 +1,16 @@
 #!./venv/Scripts/python.exe
 # -*- coding: UTF-8 -*-
+import csv
+import io
+from functools import partial
 from urllib.parse import urlsplit, quote_plus, quote, unquote_plus, unquote, parse_qsl
 
 import click
-from rich import box
-from rich.style import Style
-from rich.table import Table, Column
-from rich.text import Text
 
 from core.console import HydroConsole
+from core.streams import Meter, convert_lines, open_sink, open_source
+from core.urls import (FIELDS, Aggregate, parse, parse_json, quote_bytes, quote_stream, read_urls, unquote_bytes,
+                       unquote_stream)
 
 PORTS = {
     'http': 80, 'https': 443, 'ftp': 21, 'ssh': 22,
@@ -31,11 +33,33 @@ def operator():
 @click.option('-q', '--query', 'only_query', help='单独获取某个查询参数的值，当参数不存在时返回整个query。')
 @click.option('-f', '--skip-fragment', is_flag=True,
               help='禁止解析片段（fragment）。当#出现在URL路径中导致结果错误时使用，但可能导致query受污染。')
+@click.option('-i', '--input', 'source', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='批量解析文件中的每一行，- 表示标准输入。')
+@click.option('-O', '--output', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='批量解析的结果写入文件，默认是标准输出。')
+@click.option('-F', '--format', 'fmt', type=click.Choice(['jsonl', 'csv']), default='jsonl',
+              help='批量解析的输出格式，默认是 jsonl 。')
+@click.option('-k', '--field', metavar='N', type=click.IntRange(min=1),
+              help='URL是按空白分割后的第几个字段（从1开始），用于直接读取访问日志。默认是整行。')
+@click.option('-a', '--aggregate', is_flag=True, help='批量解析时只输出按主机、路径、查询参数名统计的次数。')
+@click.option('-n', '--top', metavar='N', type=click.IntRange(min=1), help='统计时每一种只输出次数最多的 N 个。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
-def splitter(encoding, only_path, only_query, skip_fragment):
+def splitter(encoding, only_path, only_query, skip_fragment, source, output, fmt, field, aggregate, top):
     """
     请求输入并解析一条URL。支持http、ftp等相似格式的字符串。
+
+    使用 -i 时逐行批量解析，每条URL输出为一条 JSON 记录或一行 CSV ，无法解析的行会在标准错误中报告行号。
+    -p 与 -q 同样适用于批量解析，此时每行只输出路径或参数值。
     """
+    if source is not None:
+        batch(source, output, encoding, only_path, only_query, skip_fragment, fmt, field, aggregate, top)
+        return
+
+    from rich import box
+    from rich.style import Style
+    from rich.table import Table, Column
+    from rich.text import Text
+
     console = HydroConsole()
     try:
         url = console.ask('输入一条URL：', style='cyan')
@@ -91,14 +115,110 @@ def splitter(encoding, only_path, only_query, skip_fragment):
     console.print(tb_query)
 
 
+def batch(source: str,
+          output: str | None,
+          encoding: str,
+          only_path: bool,
+          only_query: str | None,
+          skip_fragment: bool,
+          fmt: str,
+          field: int | None,
+          aggregate: bool,
+          top: int | None):
+    """
+    流式地批量解析URL。完全不经过 rich ，解析结果按URL缓存。
+    """
+    console = HydroConsole(stderr=True)
+    meter = Meter()
+    stats = Aggregate() if aggregate else None
+    errors = 0
+    try:
+        with open_source(source) as src, open_sink(output) as sink:
+            lines = io.TextIOWrapper(src, encoding='UTF-8', errors='replace', newline=None)
+            text = io.TextIOWrapper(sink, encoding='UTF-8', newline='')
+            writer = csv.writer(text, lineterminator='\n')
+            records = not (aggregate or only_path or only_query)
+            plain = records and fmt == 'jsonl'
+            if records and fmt == 'csv':
+                writer.writerow(FIELDS)
+            for lineno, url in read_urls(lines, field):
+                try:
+                    if plain:
+                        text.write(parse_json(url, encoding, not skip_fragment) + '\n')
+                        continue
+                    parsed = parse(url, encoding, not skip_fragment)
+                except ValueError as e:
+                    errors += 1
+                    console.warning(f'第 {lineno} 行无法解析：{e}')
+                    continue
+                if stats is not None:
+                    stats.add(parsed)
+                elif only_path:
+                    text.write(parsed.path + '\n')
+                elif only_query:
+                    text.write(dict(parsed.params).get(only_query, parsed.query) + '\n')
+                else:
+                    writer.writerow(parsed.to_row())
+            if stats is not None:
+                if fmt == 'csv':
+                    writer.writerow(('kind', 'key', 'count'))
+                    writer.writerows(stats.rows(top))
+                else:
+                    for line in stats.to_json(top):
+                        text.write(line + '\n')
+            text.flush()
+            meter.add(src.tell() if src.seekable() else 0)
+            # 不关闭标准输入输出
+            lines.detach()
+            text.detach()
+    except OSError as e:
+        console.warning(str(e))
+        exit(-1)
+    if errors:
+        console.warning(f'共有 {errors} 行无法解析。')
+    if output not in (None, '-'):
+        console.print('已解析', meter.report())
+
+
+def stream(source: str, output: str | None, plus: bool, decode: bool):
+    """
+    流式地编码或解码文件（或管道）的原始字节，写入文件时输出吞吐量。
+    """
+    console = HydroConsole(stderr=True)
+    meter = Meter()
+    try:
+        with open_source(source) as src, open_sink(output) as sink:
+            meter.add((unquote_stream if decode else quote_stream)(src, sink, plus))
+    except OSError as e:
+        console.warning(str(e))
+        exit(-1)
+    if output not in (None, '-'):
+        console.print('已处理', meter.report())
+
+
 @operator.command('encode', no_args_is_help=False, short_help='URL编码')
 @click.option('-e', '--encoding', default='UTF-8', help='字符串编码，默认是 UTF-8。')
 @click.option('-p', '--plus', is_flag=True, help='将空格转义为 + 号，而不是直接编码为 %20 。')
+@click.option('-i', '--input', 'source', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='流式编码文件的原始字节而不是请求输入，- 表示标准输入。')
+@click.option('-O', '--output', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='将结果写入文件，- 表示标准输出。')
+@click.option('-l', '--lines', is_flag=True, help='将输入（默认是标准输入）的每一行当作一条字符串，逐行编码。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
-def encoder(encoding, plus):
+def encoder(encoding, plus, source, output, lines):
     """
     对字符串进行URL编码，将非ASCII字符、保留字符等转换为 "%3A" 这种格式的字符串。
+
+    使用 -i 时分块编码原始字节（此时 -e 不起作用），内存占用恒定，换行符也会被编码。
+    使用 -l 时每一行都单独编码，输出的行与输入的行一一对应。
     """
+    if lines:
+        convert_lines(partial(quote_bytes, plus=plus), source, output, encoding, decode=False, failure='无法转换')
+        return
+    if source is not None:
+        stream(source, output, plus, decode=False)
+        return
+
     console = HydroConsole()
     try:
         string = console.ask('输入任意字符串：', style='cyan')
@@ -114,11 +234,26 @@ def encoder(encoding, plus):
 @operator.command('decode', no_args_is_help=False, short_help='URL解码')
 @click.option('-e', '--encoding', default='UTF-8', help='解析字符串时使用的编码，默认是 UTF-8。')
 @click.option('-p', '--plus', is_flag=True, help='将 + 号转义为空格。')
+@click.option('-i', '--input', 'source', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='流式解码文件而不是请求输入，- 表示标准输入。')
+@click.option('-O', '--output', metavar='FILE', type=click.Path(dir_okay=False, allow_dash=True),
+              help='将还原出的原始字节写入文件，- 表示标准输出。')
+@click.option('-l', '--lines', is_flag=True, help='将输入（默认是标准输入）的每一行当作一条字符串，逐行解码。')
 @click.help_option('-h', '--help', help='列出这份帮助信息。')
-def decoder(encoding, plus):
+def decoder(encoding, plus, source, output, lines):
     """
     对字符串进行URL解码，将 "%3A" 这种格式的字符串还原成原本的字符。
+
+    使用 -i 时分块解码为原始字节（此时 -e 不起作用），内存占用恒定，被块的边界截断的 %XX 也能正确还原。
+    使用 -l 时每一行都单独解码，无法按 -e 解码的行会报告行号，并输出为空行。
     """
+    if lines:
+        convert_lines(partial(unquote_bytes, plus=plus), source, output, encoding, decode=True, failure='无法转换')
+        return
+    if source is not None:
+        stream(source, output, plus, decode=True)
+        return
+
     console = HydroConsole()
     try:
         string = console.ask('输入URL编码后的字符：', style='cyan')